@@ -0,0 +1 @@
+"""Benchmarks for the Discord Pasta Bot, run with `python -m benchmarks.<name>`"""
@@ -0,0 +1,116 @@
+"""
+Measure resident memory per 1k guilds, members and messages for each memory profile.
+
+Every profile runs in a fresh interpreter against the fake gateway. Member
+joins are delivered whatever the intents, so the effect of the member cache
+flags shows on its own.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+
+def rss_kib():
+    """Current resident set size in KiB"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        # No procfs (e.g. macOS): fall back to the peak, which only grows in this benchmark
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak
+
+def measure():
+    gc.collect()
+    return rss_kib()
+
+def child(args):
+    """Load one profile with synthetic guilds, members and messages and print the RSS growth"""
+    import asyncio
+    import logging
+
+    # Config refuses to start without these; the values are never used offline
+    os.environ.setdefault("BOT_TOKEN", "offline")
+    os.environ.setdefault("DATABASE_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("MESSAGE_LOG_VERBOSITY", "off")
+    os.environ.setdefault("PASTA_CACHE_WARM", "false")
+    logging.disable(logging.CRITICAL)
+
+    from config import Config
+    from src.bot import PastaBot
+    from benchmarks.fakes import FakeGateway, InMemoryDatabase
+
+    async def run():
+        bot = PastaBot(Config())
+        bot.db = InMemoryDatabase()
+        gateway = FakeGateway(bot)
+        await gateway.connect()
+        rng = random.Random(0)
+        results = {}
+
+        start = measure()
+        guilds = [gateway.add_guild(channels=args.channels) for _ in range(args.guilds)]
+        results['guilds'] = measure() - start
+
+        start = measure()
+        user_ids = iter(range(10 ** 6, 10 ** 12))
+        members = {guild.id: [] for guild in guilds}
+        for guild in guilds:
+            for _ in range(args.members):
+                user_id = next(user_ids)
+                gateway.add_member(guild, user_id)
+                members[guild.id].append(user_id)
+        results['members'] = measure() - start
+
+        start = measure()
+        for i in range(args.messages):
+            guild = rng.choice(guilds)
+            author = rng.choice(members[guild.id]) if members[guild.id] else next(user_ids)
+            gateway.send_message(rng.choice(guild.text_channels), f"message {i} " * 5, author_id=author)
+            if i % 100 == 0:
+                await asyncio.sleep(0)
+        await asyncio.sleep(0.1)
+        results['messages'] = measure() - start
+
+        results['cached_members'] = sum(len(guild.members) for guild in bot.guilds)
+        results['cached_messages'] = len(bot.cached_messages)
+        results['quote_cache_messages'] = len(bot.recent_messages)
+        print(json.dumps(results))
+
+    asyncio.run(run())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=["lean", "full"])
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--channels", type=int, default=2, help="Text channels per guild")
+    parser.add_argument("--members", type=int, default=100, help="Member joins per guild")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    print(f"{args.guilds} guilds, {args.members} members per guild, {args.messages} messages")
+    print(f"{'profile':>8} {'KiB/1k guilds':>14} {'KiB/1k members':>15} {'KiB/1k messages':>16} "
+          f"{'members cached':>15} {'messages cached':>16}")
+    for profile in args.profiles:
+        env = dict(os.environ, MEMORY_PROFILE=profile)
+        command = [sys.executable, "-m", "benchmarks.bench_memory", "--child"] + sys.argv[1:]
+        output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+
+        per_guild = result['guilds'] * 1000 / max(args.guilds, 1)
+        per_member = result['members'] * 1000 / max(args.guilds * args.members, 1)
+        per_message = result['messages'] * 1000 / max(args.messages, 1)
+        print(f"{profile:>8} {per_guild:14.0f} {per_member:15.0f} {per_message:16.0f} "
+              f"{result['cached_members']:15} {result['cached_messages'] + result['quote_cache_messages']:16}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Put the bot through gateway disconnects against the fake gateway.
+
+Shards are dropped and then resumed or re-identified while pastas keep being
+served, and the lifecycle manager is then put through full gateway restarts.
+The run checks that the database connection and warmed caches survive all of
+it, and reports the reconnect and downtime metrics from /metrics.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# Config refuses to start without these; the values are never used offline
+os.environ.setdefault("BOT_TOKEN", "offline")
+os.environ.setdefault("DATABASE_URI", "mongodb://localhost:27017")
+os.environ.setdefault("SEND_RATE", "1000000")
+os.environ.setdefault("SEND_GLOBAL_RATE", "1000000")
+os.environ.setdefault("MESSAGE_LOG_VERBOSITY", "off")
+os.environ.setdefault("PASTA_USER_RATE", "0")
+os.environ.setdefault("PASTA_GUILD_RATE", "0")
+
+import discord
+
+from config import Config
+from src.bot import PastaBot
+from src.utils.lifecycle import BotLifecycle
+from benchmarks.fakes import FakeGateway, InMemoryDatabase
+
+class ReconnectBenchmark:
+    def __init__(self, args):
+        self.args = args
+        self.config = Config()
+        self.bot = PastaBot(self.config)
+        self.db = self.bot.db = InMemoryDatabase(latency=args.db_latency)
+        self.gateway = FakeGateway(self.bot)
+        self.guilds = []
+
+    async def setup(self):
+        await self.gateway.connect()
+        for _ in range(self.args.guilds):
+            guild = self.gateway.add_guild()
+            await self.db.add_command(guild.id, "pasta", "pasta goes here")
+            await self.bot.warm_pasta_cache(guild.id)
+            self.guilds.append(guild)
+
+    async def serve(self):
+        """Serve one pasta per guild"""
+        for guild in self.guilds:
+            channel = guild.text_channels[0]
+            payload = self.gateway.message_payload(channel, f"{self.config.cmd_prefix}pasta", author_id=2)
+            await self.bot.on_message(discord.Message(state=self.gateway.state, channel=channel, data=payload))
+
+    async def shard_outages(self):
+        """
+        Drop shard 0 repeatedly, alternating between resumed and new sessions.
+
+        Returns the database operations taken meanwhile, including any the
+        reconnect event handlers made.
+        """
+        before = sum(self.db.operations.values())
+        for cycle in range(self.args.cycles):
+            self.gateway.disconnect(0)
+            await asyncio.sleep(self.args.outage)
+            await self.serve()
+            if cycle % 2:
+                self.gateway.reidentify(0)
+            else:
+                self.gateway.resume(0)
+            # Let the dispatched events run
+            await asyncio.sleep(0)
+            await self.serve()
+        # Let any database work the last reconnect started finish
+        await asyncio.sleep(self.args.outage)
+        return sum(self.db.operations.values()) - before
+
+    async def restarts(self):
+        """Fail the gateway a few times under the lifecycle manager, then shut down"""
+        lifecycle = BotLifecycle(self.bot, backoff_base=self.args.outage / 4)
+        attempts = 0
+
+        async def fake_run_bot():
+            nonlocal attempts
+            attempts += 1
+            # What start() does: log in (running setup_hook again) and connect
+            await self.gateway.connect()
+            self.bot.dispatch('ready')
+            await asyncio.sleep(self.args.outage)
+            if attempts <= self.args.restarts:
+                raise ConnectionResetError("simulated gateway failure")
+            lifecycle.stop()
+
+        self.bot.run_bot = fake_run_bot
+        await lifecycle.run()
+        return attempts
+
+    async def run(self):
+        await self.setup()
+        start = time.perf_counter()
+        outage_db_operations = await self.shard_outages()
+        db_closed_before_restarts = self.db.closed
+        warmed_before = self.bot.pasta_cache.stats()['guilds_warmed']
+        attempts = await self.restarts()
+        elapsed = time.perf_counter() - start
+
+        print(f"{self.args.cycles} shard outages and {attempts} gateway starts in {elapsed:.2f}s")
+        print(f"database operations across outages: {outage_db_operations}")
+        print(f"database closed before shutdown: {db_closed_before_restarts}, after shutdown: {self.db.closed}")
+        print(f"guilds warmed before restarts: {warmed_before}, "
+              f"after: {self.bot.pasta_cache.stats()['guilds_warmed']}")
+        print()
+        for line in self.bot.metrics.render().splitlines():
+            if line.startswith(("gateway_reconnects_total", "gateway_restarts_total", "gateway_downtime_seconds_sum",
+                                "gateway_downtime_seconds_count")):
+                print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--guilds", type=int, default=20)
+    parser.add_argument("--cycles", type=int, default=10, help="Shard disconnects to simulate")
+    parser.add_argument("--restarts", type=int, default=3, help="Full gateway failures to simulate")
+    parser.add_argument("--outage", type=float, default=0.05, help="Seconds each outage lasts")
+    parser.add_argument("--db-latency", type=float, default=0.001, help="Simulated database round trip in seconds")
+    args = parser.parse_args()
+
+    asyncio.run(ReconnectBenchmark(args).run())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Measure cold start: import time, bot construction and time to READY.
+
+Every run is a fresh interpreter, so imports are really cold. Discord and
+the database are replaced by benchmarks.fakes, with simulated latencies for
+the login request, the IDENTIFY -> READY handshake and database round trips.
+With --mongo-uri the real MongoDB backend is set up instead of the fake one,
+which also checks that connecting, creating indexes and loading cooldowns work.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PHASES = ("import_main", "create_bot", "setup_hook", "ready", "db_ready", "total")
+
+def child(args):
+    """Run one cold start and print its timings as JSON"""
+    start = time.perf_counter()
+    timings = {}
+
+    def mark(phase):
+        timings[phase] = (time.perf_counter() - start) * 1000
+
+    # Config refuses to start without these; the values are never used offline
+    os.environ.setdefault("BOT_TOKEN", "offline")
+    os.environ.setdefault("DATABASE_URI", "mongodb://localhost:27017")
+    if args.mongo_uri:
+        os.environ["DATABASE_URI"] = args.mongo_uri
+
+    import main
+    mark("import_main")
+
+    import asyncio
+    import logging
+    logging.disable(logging.CRITICAL)
+    bot = main.create_bot()
+    mark("create_bot")
+
+    from benchmarks.fakes import FakeGateway, InMemoryDatabase
+
+    async def start_up():
+        if not args.mongo_uri:
+            bot.db = InMemoryDatabase(latency=args.db_latency)
+        gateway = FakeGateway(bot, http_latency=args.http_latency)
+
+        # What PastaBot.login does: start the database, then log in while it connects
+        bot.prepare_database()
+        if args.sequential:
+            await bot.db_ready
+        await asyncio.sleep(args.login_latency)
+        await gateway.connect()
+        mark("setup_hook")
+
+        # IDENTIFY -> READY
+        await asyncio.sleep(args.gateway_latency)
+        mark("ready")
+
+        timings["db_ok"] = await bot.db_ready
+        mark("db_ready")
+        await bot.db.close()
+
+    asyncio.run(start_up())
+    mark("total")
+    timings["lazy_modules"] = [name for name in ("pymongo", "pytz") if name not in sys.modules]
+    print(json.dumps(timings))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--db-latency", type=float, default=0.05, help="Simulated database round trip in seconds")
+    parser.add_argument("--http-latency", type=float, default=0.0, help="Simulated Discord API latency in seconds")
+    parser.add_argument("--login-latency", type=float, default=0.1, help="Simulated login request in seconds")
+    parser.add_argument("--gateway-latency", type=float, default=0.3,
+                        help="Simulated IDENTIFY to READY time in seconds")
+    parser.add_argument("--mongo-uri", default=os.environ.get("BENCH_MONGO_URI"),
+                        help="Set up a real (scratch) MongoDB instead of the in-memory database")
+    parser.add_argument("--sequential", action="store_true",
+                        help="Wait for the database before logging in, as startup used to")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    command = [sys.executable, "-m", "benchmarks.bench_startup", "--child"] + sys.argv[1:]
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{args.runs} cold starts, median ms since the start of each run")
+    for phase in PHASES:
+        print(f"{phase:>12}: {statistics.median(run[phase] for run in runs):8.1f}")
+    print(f"not imported: {', '.join(runs[0]['lazy_modules']) or 'none'}")
+    if not all(run["db_ok"] for run in runs):
+        print("database setup FAILED, run with the bot's logging to see why")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compare storage backends on the pasta lookup hot path (Database.get_command)"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from src.utils.db import Database
+from src.utils.sqlite_db import SQLiteDatabase
+from benchmarks.fakes import InMemoryDatabase
+
+async def populate(db, guilds, commands):
+    for guild_id in range(1, guilds + 1):
+        await db.add_commands(guild_id, {f"pasta{i}": f"pasta {i} content " * 10 for i in range(commands)})
+
+async def measure(label, db, args):
+    await populate(db, args.guilds, args.commands)
+    rng = random.Random(args.seed)
+    timings = []
+
+    for _ in range(args.lookups):
+        guild_id = rng.randint(1, args.guilds)
+        # Mix in misses, as on_command_error sees them for typos
+        command = f"pasta{rng.randrange(int(args.commands * 1.1))}"
+        start = time.perf_counter()
+        await db.get_command(guild_id, command)
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    p50 = timings[len(timings) // 2] * 1e6
+    p99 = timings[int(len(timings) * 0.99)] * 1e6
+    print(f"{label:>8}: p50 {p50:9.1f} us, p99 {p99:9.1f} us, mean {statistics.fmean(timings) * 1e6:9.1f} us")
+    await db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--guilds", type=int, default=100)
+    parser.add_argument("--commands", type=int, default=100, help="Pastas per guild")
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--mongo-uri", default=os.environ.get("BENCH_MONGO_URI"),
+                        help="MongoDB to compare against; it is written to, so use a scratch instance")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    async def run():
+        await measure("memory", InMemoryDatabase(), args)
+        with tempfile.TemporaryDirectory() as directory:
+            await measure("sqlite", SQLiteDatabase(f"sqlite:///{os.path.join(directory, 'bench.db')}"), args)
+        if args.mongo_uri:
+            db = Database(args.mongo_uri, schema="single")
+            await db.ensure_indexes()
+            await measure("mongo", db, args)
+        else:
+            print("   mongo: skipped, pass --mongo-uri to include it")
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
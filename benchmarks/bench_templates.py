@@ -0,0 +1,76 @@
+"""Benchmark rendering templated pastas from compiled plans against parsing them on every use"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from src.utils.templates import PLACEHOLDER, compile_template
+
+TEMPLATES = {
+    "static": "I'd just like to interject for a moment. " * 20,
+    "user": "Hey {user}, welcome to {channel}! " * 5,
+    "args": "{user} slaps {arg1} around a bit with a large {arg2}",
+    "random": "{mention} rolled {random:1|2|3|4|5|6} and drew {random:a jack|a queen|a king|an ace}",
+    "mixed": "{user} -> {arg1}: {random:yes|no|maybe} (used {count} times) {{literal}} " * 4,
+}
+
+def naive_render(text, message, args, count):
+    """Parse and substitute the placeholders on every use, as a simple implementation would"""
+    words = args.split()
+    values = {
+        'user': message.author.display_name,
+        'mention': message.author.mention,
+        'channel': message.channel.mention,
+        'count': str(count),
+    }
+
+    def replace(match):
+        name, options = match.groups()
+        if name == 'random' and options:
+            return random.choice(options.split("|"))
+        if name.startswith("arg") and name[3:].isdigit():
+            index = int(name[3:]) - 1
+            return words[index] if index < len(words) else ""
+        return values.get(name, match.group(0))
+
+    return PLACEHOLDER.sub(replace, text)
+
+def render_compiled(text, message, args, count):
+    template = compile_template(text)
+    if template is None:
+        return text
+    return template.render(message, args, count)
+
+def run(render, text, message, iterations):
+    start = time.perf_counter()
+    for count in range(iterations):
+        render(text, message, "@Bob trout", count)
+    elapsed = time.perf_counter() - start
+    return f"{elapsed / iterations * 1e6:8.2f}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+
+    message = SimpleNamespace(
+        author=SimpleNamespace(display_name="Alice", mention="<@1234567890>"),
+        channel=SimpleNamespace(mention="<#9876543210>"),
+    )
+
+    # Check both renderers agree where the output doesn't depend on random choices
+    for text in (TEMPLATES["user"], TEMPLATES["args"]):
+        assert naive_render(text, message, "@Bob trout", 1) == render_compiled(text, message, "@Bob trout", 1)
+
+    start = time.perf_counter()
+    for text in TEMPLATES.values():
+        compile_template.__wrapped__(text)
+    print(f"compile: {(time.perf_counter() - start) / len(TEMPLATES) * 1e6:.1f} us/template (once, at !add)")
+
+    print(f"{'template':>8} {'naive us':>9} {'compiled us':>12}")
+    for name, text in TEMPLATES.items():
+        print(f"{name:>8} {run(naive_render, text, message, args.iterations):>9} "
+              f"{run(render_compiled, text, message, args.iterations):>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark quote timestamp formatting"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+from src.utils import timestamp
+
+def uncached_format(d, timezone):
+    """The original approach: resolve the zone and today's date on every call"""
+    now = datetime.now(pytz.timezone(timezone))
+    localized_date = d.astimezone(pytz.timezone(timezone))
+    if localized_date.date() == now.date():
+        return f"Today at {localized_date.strftime('%I:%M %p')}"
+    elif localized_date.date() > (now - timedelta(days=7)).date():
+        return localized_date.strftime('%A at %I:%M %p')
+    return localized_date.strftime('%m/%d/%Y')
+
+def run(label, format_all, dates, zones, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        format_all(dates, zones)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>8}: {elapsed / (len(dates) * rounds) * 1e6:8.2f} us/timestamp")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--timestamps", type=int, default=10000)
+    parser.add_argument("--days", type=float, default=7, help="How far back the quoted messages go")
+    parser.add_argument("--zones", nargs="+", default=["America/New_York", "Europe/Berlin", "Asia/Tokyo"])
+    parser.add_argument("--batch", type=int, default=10, help="Timestamps formatted per call in batch mode")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    now = datetime.now(pytz.utc)
+    dates = [now - timedelta(seconds=random.uniform(0, args.days * 86400)) for _ in range(args.timestamps)]
+    zones = [random.choice(args.zones) for _ in dates]
+
+    # Make the results comparable before timing anything
+    for d, zone in zip(dates[:1000], zones):
+        assert uncached_format(d, zone) == timestamp.format_date_for_quotes(d, zone)
+
+    def batched(dates, zones):
+        for i in range(0, len(dates), args.batch):
+            timestamp.format_dates_for_quotes(dates[i:i + args.batch], zones[i])
+
+    print(f"{len(dates)} timestamps across {len(args.zones)} zones")
+    run("uncached", lambda dates, zones: [uncached_format(d, z) for d, z in zip(dates, zones)], dates, zones, args.rounds)
+    run("cached", lambda dates, zones: [timestamp.format_date_for_quotes(d, z) for d, z in zip(dates, zones)],
+        dates, zones, args.rounds)
+    run("batched", batched, dates, zones, args.rounds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Replay synthetic traffic through the real PastaBot, cogs and event handlers.
+
+Everything runs offline: Discord is replaced by benchmarks.fakes.FakeGateway
+and MongoDB by benchmarks.fakes.InMemoryDatabase.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+import tracemalloc
+from collections import defaultdict
+
+# Config refuses to start without these; the values are never used offline
+os.environ.setdefault("BOT_TOKEN", "offline")
+os.environ.setdefault("DATABASE_URI", "mongodb://localhost:27017")
+# Send as fast as the fake endpoint allows unless overridden
+os.environ.setdefault("SEND_RATE", "1000000")
+os.environ.setdefault("SEND_GLOBAL_RATE", "1000000")
+os.environ.setdefault("MESSAGE_LOG_VERBOSITY", "off")
+# Synthetic users hammer commands far faster than the spam limits allow
+os.environ.setdefault("PASTA_USER_RATE", "0")
+os.environ.setdefault("PASTA_GUILD_RATE", "0")
+
+from config import Config
+from src.bot import PastaBot
+from benchmarks.fakes import FakeGateway, InMemoryDatabase
+
+CHAT = [
+    "anyone up for a game tonight?",
+    "lol",
+    "that's what she said",
+    "brb getting food",
+    "has anyone seen the new trailer",
+    "gg",
+]
+
+def parse_mix(spec):
+    """Parse "hit=0.6,miss=0.1,..." into a dict of normalised weights"""
+    weights = {}
+    for item in spec.split(","):
+        kind, _, weight = item.partition("=")
+        weights[kind.strip()] = float(weight)
+    total = sum(weights.values())
+    return {kind: weight / total for kind, weight in weights.items()}
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+class TrafficBenchmark:
+    """Drives a PastaBot with synthetic guilds and messages and records handler latency"""
+
+    def __init__(self, args):
+        self.args = args
+        self.config = Config()
+        self.bot = PastaBot(self.config)
+        self.db = self.bot.db = InMemoryDatabase(latency=args.db_latency)
+        self.gateway = FakeGateway(self.bot, http_latency=args.http_latency)
+
+        self.guilds = []
+        self.commands = {}
+        self.recent = defaultdict(list)
+
+        self.kinds = {}
+        self.latencies = defaultdict(list)
+        self.pending = 0
+        self.drained = asyncio.Event()
+
+    def wrap_on_message(self):
+        """Time every on_message call as dispatched by discord.py"""
+        handler = self.bot.on_message
+
+        async def timed_on_message(message):
+            start = time.perf_counter()
+            try:
+                await handler(message)
+            finally:
+                kind = self.kinds.pop(message.id, None)
+                if kind is not None:
+                    self.latencies[kind].append(time.perf_counter() - start)
+                    self.pending -= 1
+                    self.drained.set()
+
+        self.bot.on_message = timed_on_message
+
+    async def setup(self):
+        await self.gateway.connect()
+        self.wrap_on_message()
+
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+
+        for _ in range(self.args.guilds):
+            guild = self.gateway.add_guild(channels=self.args.channels)
+            names = [f"pasta{i}" for i in range(self.args.commands)]
+            for name in names:
+                await self.db.add_command(guild.id, name, f"{name} goes here " * 10)
+            # Keep the easter eggs (and their 5 minute cooldowns) out of the numbers
+            await self.db.update_guild_settings(guild.id, {'disabled_scripts': list(self.bot.scripts)})
+            if self.config.pasta_cache_warm:
+                await self.bot.warm_pasta_cache(guild.id)
+            self.guilds.append(guild)
+            self.commands[guild.id] = names
+
+        after, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.memory_per_guild = (after - before) / max(1, self.args.guilds)
+        self.db.operations.clear()
+
+    def next_message(self, rng, mix):
+        guild = rng.choice(self.guilds)
+        channel = rng.choice(guild.text_channels)
+        prefix = self.config.cmd_prefix
+        kind = rng.choices(list(mix), weights=list(mix.values()))[0]
+        reference = None
+
+        if kind == "hit":
+            content = prefix + rng.choice(self.commands[guild.id])
+        elif kind == "miss":
+            content = f"{prefix}nope{rng.randrange(10 ** 6)}"
+        elif kind == "help":
+            content = f"{prefix}help"
+        elif kind == "quote" and self.recent[channel.id]:
+            content = f"{prefix}quote"
+            reference = rng.choice(self.recent[channel.id])
+        else:
+            kind = "chat"
+            content = rng.choice(CHAT)
+
+        return kind, channel, content, reference
+
+    async def run(self):
+        args = self.args
+        rng = random.Random(args.seed)
+        mix = parse_mix(args.mix)
+        interval = 1 / args.rate if args.rate else 0
+
+        start = time.perf_counter()
+        for _ in range(args.messages):
+            while self.pending >= args.concurrency:
+                self.drained.clear()
+                await self.drained.wait()
+
+            kind, channel, content, reference = self.next_message(rng, mix)
+            self.pending += 1
+            data = self.gateway.send_message(channel, content, author_id=rng.randrange(2, 10 ** 6), reference=reference)
+            self.kinds[int(data['id'])] = kind
+            if kind == "chat":
+                self.recent[channel.id] = (self.recent[channel.id] + [data])[-20:]
+
+            await asyncio.sleep(interval)
+
+        while self.pending:
+            self.drained.clear()
+            await self.drained.wait()
+        elapsed = time.perf_counter() - start
+
+        self.report(elapsed)
+        await self.bot.db.close()
+
+    def report(self, elapsed):
+        total = sum(len(values) for values in self.latencies.values())
+        print(f"{self.args.guilds} guilds, {self.args.commands} pastas per guild, {total} messages in {elapsed:.2f}s")
+        print(f"throughput: {total / elapsed:,.0f} messages/s")
+        print(f"memory per guild (incl. warmed cache): {self.memory_per_guild / 1024:.1f} KiB")
+        print(f"{'kind':>6} {'count':>7} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+
+        everything = []
+        for kind, values in sorted(self.latencies.items()):
+            everything.extend(values)
+            print(f"{kind:>6} {len(values):>7} {percentile(values, 50) * 1000:8.3f} "
+                  f"{percentile(values, 99) * 1000:8.3f} {statistics.fmean(values) * 1000:8.3f}")
+        print(f"{'all':>6} {len(everything):>7} {percentile(everything, 50) * 1000:8.3f} "
+              f"{percentile(everything, 99) * 1000:8.3f} {statistics.fmean(everything) * 1000:8.3f}")
+
+        print(f"cache: {self.bot.pasta_cache.stats()}")
+        print(f"db operations: {dict(self.db.operations)}")
+        print(f"http requests: {sum(self.gateway.requests.values())}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--guilds", type=int, default=100)
+    parser.add_argument("--channels", type=int, default=3, help="Text channels per guild")
+    parser.add_argument("--commands", type=int, default=50, help="Pastas per guild")
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--rate", type=float, default=0, help="Messages per second, 0 for as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=100, help="Maximum messages in flight")
+    parser.add_argument("--mix", default="hit=0.5,miss=0.1,help=0.05,quote=0.05,chat=0.3")
+    parser.add_argument("--db-latency", type=float, default=0.001, help="Simulated database round trip in seconds")
+    parser.add_argument("--http-latency", type=float, default=0.0, help="Simulated Discord API latency in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    async def run():
+        benchmark = TrafficBenchmark(args)
+        await benchmark.setup()
+        await benchmark.run()
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
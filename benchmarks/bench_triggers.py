@@ -0,0 +1,62 @@
+"""Benchmark easter egg trigger matching over a message corpus"""
+import argparse
+import os
+import time
+
+from src.utils.triggers import TriggerMatcher, load_trigger_registry
+
+def load_corpus(path):
+    """Load one message per line, defaulting to the lines of the bundled assets"""
+    if path:
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            return [line.rstrip("\n") for line in f if line.strip()]
+
+    corpus = []
+    for name in sorted(os.listdir("assets")):
+        if name.endswith(".txt"):
+            with open(os.path.join("assets", name), "rb") as f:
+                corpus.extend(line.decode(errors="ignore").strip() for line in f if line.strip())
+    return corpus
+
+def linear_scan(registry, scripts):
+    """The original approach: startswith over every trigger phrase"""
+    triggers = [
+        (trigger if isinstance(trigger, str) else trigger["phrase"], script)
+        for script in scripts
+        for trigger in registry.get(script, [script])
+    ]
+    return lambda text: next((script for trigger, script in triggers if text.startswith(trigger)), None)
+
+def run(label, match, corpus, rounds):
+    start = time.perf_counter()
+    hits = 0
+    for _ in range(rounds):
+        for text in corpus:
+            if match(text) is not None:
+                hits += 1
+    elapsed = time.perf_counter() - start
+    total = len(corpus) * rounds
+    print(f"{label:>8}: {elapsed / total * 1e9:8.1f} ns/message, {hits // rounds} matches per round")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--corpus", help="File with one recorded message per line")
+    parser.add_argument("--registry", default="assets/triggers.json")
+    parser.add_argument("--extra-triggers", type=int, default=0,
+                        help="Register this many synthetic triggers to test scaling")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    registry = load_trigger_registry(args.registry)
+    scripts = list(registry)
+    if args.extra_triggers:
+        registry = dict(registry, synthetic=[f"synthetic trigger {i}" for i in range(args.extra_triggers)])
+        scripts.append("synthetic")
+
+    print(f"{len(corpus)} messages, {sum(len(registry.get(s, [s])) for s in scripts)} triggers")
+    run("linear", linear_scan(registry, scripts), corpus, args.rounds)
+    run("trie", TriggerMatcher.from_registry(registry, scripts).match, corpus, args.rounds)
+
+if __name__ == "__main__":
+    main()
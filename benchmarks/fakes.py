@@ -0,0 +1,288 @@
+"""Offline stand-ins for the Discord gateway/HTTP API and MongoDB"""
+import asyncio
+import copy
+import itertools
+import time
+from collections import Counter
+
+import discord
+from discord import utils
+
+class InMemoryDatabase:
+    """Drop-in replacement for src.utils.db.Database keeping everything in dicts"""
+
+    def __init__(self, latency=0.0):
+        """
+        Args:
+            latency (float): Seconds to sleep per operation, to simulate a network round trip.
+        """
+        self.latency = latency
+        self.guilds = {}
+        self.settings = {}
+        self.cooldowns = {}
+        # (guild_id, command, hour) -> uses
+        self.usage = Counter()
+        self.operations = Counter()
+        self.closed = False
+
+    async def _round_trip(self, operation):
+        self.operations[operation] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def get_collection(self, guild_id):
+        return self.guilds.setdefault(guild_id, {})
+
+    async def connect(self):
+        await self._round_trip("connect")
+
+    async def ensure_indexes(self):
+        pass
+
+    async def add_command(self, guild_id, command, content):
+        await self._round_trip("add_command")
+        collection = self.get_collection(guild_id)
+        is_new = command not in collection
+        collection[command] = {'_id': command, 'content': content}
+        return is_new
+
+    async def add_commands(self, guild_id, commands, batch_size=1000):
+        for _ in range(0, len(commands), batch_size):
+            await self._round_trip("add_commands")
+        self.get_collection(guild_id).update(
+            (command, {'_id': command, 'content': content}) for command, content in commands.items()
+        )
+        return len(commands)
+
+    async def remove_command(self, guild_id, command):
+        await self._round_trip("remove_command")
+        return self.get_collection(guild_id).pop(command, None) is not None
+
+    async def get_command(self, guild_id, command):
+        await self._round_trip("get_command")
+        document = self.get_collection(guild_id).get(command)
+        return dict(document) if document is not None else None
+
+    async def get_all_commands(self, guild_id):
+        await self._round_trip("get_all_commands")
+        collection = self.get_collection(guild_id)
+        return [dict(collection[name]) for name in sorted(collection)]
+
+    async def iter_commands(self, guild_id):
+        await self._round_trip("iter_commands")
+        collection = self.get_collection(guild_id)
+        for name in sorted(collection):
+            yield dict(collection[name])
+
+    async def iter_command_names(self, guild_id):
+        await self._round_trip("iter_command_names")
+        for name in sorted(self.get_collection(guild_id)):
+            yield name
+
+    async def get_guild_settings(self, guild_id):
+        await self._round_trip("get_guild_settings")
+        return dict(self.settings.get(guild_id, {}))
+
+    async def update_guild_settings(self, guild_id, settings):
+        await self._round_trip("update_guild_settings")
+        self.settings.setdefault(guild_id, {}).update(settings)
+
+    async def set_user_timezone(self, guild_id, user_id, timezone):
+        await self._round_trip("set_user_timezone")
+        user_timezones = self.settings.setdefault(guild_id, {}).setdefault('user_timezones', {})
+        if timezone is None:
+            user_timezones.pop(str(user_id), None)
+        else:
+            user_timezones[str(user_id)] = timezone
+
+    async def get_cooldowns(self):
+        await self._round_trip("get_cooldowns")
+        now = time.time()
+        return {key: expires_at for key, expires_at in self.cooldowns.items() if expires_at > now}
+
+    async def save_cooldowns(self, cooldowns):
+        if cooldowns:
+            await self._round_trip("save_cooldowns")
+            self.cooldowns.update(cooldowns)
+
+    async def save_usage(self, usage):
+        if usage:
+            await self._round_trip("save_usage")
+            self.usage.update(usage)
+
+    async def get_top_commands(self, guild_id, since, limit=10):
+        await self._round_trip("get_top_commands")
+        totals = Counter()
+        for (usage_guild_id, command, hour), uses in self.usage.items():
+            if usage_guild_id == guild_id and hour >= since:
+                totals[command] += uses
+        return sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    async def get_usage(self, guild_id, since, command=None):
+        await self._round_trip("get_usage")
+        hours = Counter()
+        for (usage_guild_id, name, hour), uses in self.usage.items():
+            if usage_guild_id == guild_id and hour >= since and command in (None, name):
+                hours[hour] += uses
+        return dict(hours)
+
+    async def ping(self):
+        await self._round_trip("ping")
+
+    async def close(self):
+        self.closed = True
+
+def user_payload(user_id, name=None, bot=False):
+    return {
+        'id': str(user_id),
+        'username': name or f"user{user_id}",
+        'discriminator': '0',
+        'global_name': None,
+        'avatar': None,
+        'bot': bot,
+    }
+
+class FakeGateway:
+    """
+    Feeds synthetic gateway events into a bot without a network connection.
+
+    Guilds and messages are built as raw payloads and parsed by discord.py's
+    own ConnectionState, so the bot sees the same objects as in production.
+    All HTTP requests are answered by `request`, which replaces the bot's
+    HTTPClient.request.
+    """
+
+    def __init__(self, bot, http_latency=0.0):
+        self.bot = bot
+        self.state = bot._connection
+        self.http_latency = http_latency
+        self.requests = Counter()
+        self.messages = {}
+        self._ids = itertools.count(utils.time_snowflake(utils.utcnow()))
+
+        bot.http.request = self.request
+
+    def next_id(self):
+        return next(self._ids)
+
+    async def connect(self, user_id=1):
+        """Log the bot in as a fake user and run its setup hooks, as login() would"""
+        self.state.user = discord.ClientUser(
+            state=self.state,
+            data=dict(user_payload(user_id, "PastaBot", bot=True), verified=True, mfa_enabled=False, flags=0)
+        )
+        await self.bot._async_setup_hook()
+        await self.bot.setup_hook()
+
+    def disconnect(self, shard_id=0):
+        """Drop a shard's connection, as a network hiccup would"""
+        self.bot.dispatch('shard_disconnect', shard_id)
+
+    def resume(self, shard_id=0):
+        """Resume a dropped shard's session"""
+        self.bot.dispatch('shard_resumed', shard_id)
+
+    def reidentify(self, shard_id=0):
+        """Bring a dropped shard back with a new session, which makes its guilds available again"""
+        for guild in self.bot.guilds:
+            if guild.shard_id == shard_id:
+                self.bot.dispatch('guild_available', guild)
+        self.bot.dispatch('shard_ready', shard_id)
+
+    def member_payload(self, user_id, guild_id=None):
+        data = {
+            'user': user_payload(user_id, bot=user_id == self.state.self_id),
+            'roles': [],
+            'joined_at': utils.utcnow().isoformat(),
+            'deaf': False,
+            'mute': False,
+            'flags': 0,
+        }
+        if guild_id is not None:
+            data['guild_id'] = str(guild_id)
+        return data
+
+    def add_member(self, guild, user_id):
+        """Dispatch a GUILD_MEMBER_ADD, which discord.py caches if the member cache flags allow it"""
+        self.state.parse_guild_member_add(self.member_payload(user_id, guild.id))
+
+    def add_guild(self, name=None, channels=1):
+        """Create a guild with some text channels, returning the discord.Guild"""
+        guild_id = self.next_id()
+        data = {
+            'id': str(guild_id),
+            'name': name or f"guild{guild_id}",
+            'owner_id': '1',
+            'member_count': 1,
+            'roles': [{'id': str(guild_id), 'name': '@everyone', 'permissions': '0', 'position': 0}],
+            'channels': [
+                {'id': str(self.next_id()), 'type': 0, 'name': f"channel{i}", 'position': i}
+                for i in range(channels)
+            ],
+            # Like Discord, GUILD_CREATE always includes the bot's own member
+            'members': [self.member_payload(self.state.self_id)] if self.state.user else [],
+            'unavailable': False,
+        }
+        return self.state._add_guild_from_data(data)
+
+    def message_payload(self, channel, content, author_id, reference=None, **fields):
+        """Build a MESSAGE_CREATE payload"""
+        message_id = self.next_id()
+        data = {
+            'id': str(message_id),
+            'channel_id': str(channel.id),
+            'author': user_payload(author_id, bot=author_id == self.state.user.id),
+            'content': content or "",
+            'timestamp': utils.snowflake_time(message_id).isoformat(),
+            'edited_timestamp': None,
+            'tts': False,
+            'mention_everyone': False,
+            'mentions': [],
+            'mention_roles': [],
+            'attachments': [],
+            'embeds': [],
+            'pinned': False,
+            'type': 0,
+        }
+        guild = getattr(channel, 'guild', None)
+        if guild is not None:
+            data['guild_id'] = str(guild.id)
+        if reference is not None:
+            data['type'] = 19
+            data['message_reference'] = {
+                'message_id': reference['id'],
+                'channel_id': reference['channel_id'],
+                'guild_id': reference.get('guild_id'),
+            }
+            data['referenced_message'] = copy.deepcopy(reference)
+        data.update(fields)
+        self.messages[message_id] = data
+        return data
+
+    def send_message(self, channel, content, author_id=2, reference=None):
+        """Dispatch a MESSAGE_CREATE as if a user posted it, returning the payload"""
+        data = self.message_payload(channel, content, author_id, reference=reference)
+        self.state.parse_message_create(data)
+        return data
+
+    async def request(self, route, *, files=None, form=None, **kwargs):
+        """Answer a REST request the way Discord would, without the network"""
+        self.requests[(route.method, route.path)] += 1
+        if self.http_latency:
+            await asyncio.sleep(self.http_latency)
+
+        key = (route.method, route.path)
+        if key == ('POST', '/channels/{channel_id}/messages'):
+            payload = kwargs.get('json') or {}
+            channel = self.bot.get_channel(route.channel_id) or discord.Object(route.channel_id)
+            return self.message_payload(
+                channel, payload.get('content'), self.state.user.id, embeds=payload.get('embeds') or []
+            )
+        if key == ('POST', '/users/@me/channels'):
+            recipient = kwargs['json']['recipient_id']
+            return {'id': str(self.next_id()), 'type': 1, 'recipients': [user_payload(recipient)]}
+        if key == ('GET', '/channels/{channel_id}/messages/{message_id}'):
+            return self.messages[int(route.url.rsplit('/', 1)[1])]
+        if key == ('GET', '/channels/{channel_id}/messages'):
+            return []
+        return None
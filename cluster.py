@@ -0,0 +1,199 @@
+"""Multi-process cluster launcher for Discord Pasta Bot"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import sys
+import time
+import urllib.request
+from collections import deque
+
+from dotenv import load_dotenv
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("cluster")
+
+# A worker that stays up this long has its restart backoff reset
+STABLE_AFTER = 300
+
+def shard_for_guild(guild_id, shard_count):
+    """Get the shard a guild is assigned to, using Discord's sharding formula"""
+    return (guild_id >> 22) % shard_count
+
+def shard_ranges(shard_count, workers):
+    """Split shard IDs into contiguous, evenly sized ranges, one per worker"""
+    workers = max(1, min(workers, shard_count))
+    size, extra = divmod(shard_count, workers)
+    ranges = []
+    start = 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+def recommended_shard_count(token):
+    """Ask Discord how many shards the bot should run"""
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}", "User-Agent": "DiscordBot (discord_pasta_bot, 1.0)"}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)["shards"]
+
+def run_worker(cluster_id, shard_ids, shard_count, simulate):
+    """Entry point of a worker process running a range of shards"""
+    os.environ["SHARD_COUNT"] = str(shard_count)
+    os.environ["SHARD_IDS"] = ",".join(map(str, shard_ids))
+    os.environ["CLUSTER_ID"] = str(cluster_id)
+    # Every worker serves its own health endpoint
+    base_port = int(os.environ.get("KEEPALIVE_PORT", 10000))
+    os.environ["KEEPALIVE_PORT"] = str(base_port + cluster_id)
+
+    if simulate:
+        run_simulated_worker(cluster_id, shard_ids, shard_count)
+        return
+
+    import main
+    main.main()
+
+def run_simulated_worker(cluster_id, shard_ids, shard_count):
+    """Stand-in for a real worker: assign fake guilds to shards, then crash at random"""
+    guilds = [random.getrandbits(63) for _ in range(1000)]
+    owned = {shard_id: 0 for shard_id in shard_ids}
+    for guild_id in guilds:
+        shard_id = shard_for_guild(guild_id, shard_count)
+        if shard_id in owned:
+            owned[shard_id] += 1
+
+    logger.info(f"[cluster {cluster_id}] shards {shard_ids} own {sum(owned.values())}/1000 fake guilds: {owned}")
+    time.sleep(random.uniform(2, 10))
+    if random.random() < 0.5:
+        logger.error(f"[cluster {cluster_id}] simulated crash")
+        sys.exit(1)
+
+class Worker:
+    """A supervised worker process and its restart state"""
+
+    def __init__(self, cluster_id, shard_ids):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.process = None
+        self.started_at = 0.0
+        self.failures = 0
+
+class Supervisor:
+    """Runs one process per shard range and restarts failed workers one at a time"""
+
+    def __init__(self, shard_count, workers, restart_delay=5.0, simulate=False):
+        """
+        Args:
+            shard_count (int): Total number of shards across the cluster.
+            workers (int): Number of worker processes to spread shards across.
+            restart_delay (float): Minimum seconds between two restarts, and the
+                base of each worker's exponential restart backoff.
+            simulate (bool): Run fake workers instead of connecting to Discord.
+        """
+        self.shard_count = shard_count
+        self.restart_delay = restart_delay
+        self.simulate = simulate
+        self.context = multiprocessing.get_context("spawn")
+        self.workers = [Worker(i, ids) for i, ids in enumerate(shard_ranges(shard_count, workers))]
+        self.restarts = deque()
+        self.last_restart = 0.0
+        self.stopping = False
+
+    def spawn(self, worker):
+        worker.process = self.context.Process(
+            target=run_worker,
+            args=(worker.cluster_id, worker.shard_ids, self.shard_count, self.simulate),
+            name=f"cluster-{worker.cluster_id}",
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        logger.info(f"Started cluster {worker.cluster_id} (pid {worker.process.pid}) with shards {worker.shard_ids}")
+
+    def check(self):
+        """Queue every worker that has exited for a restart"""
+        for worker in self.workers:
+            if worker.process is None or worker.process.is_alive() or worker in self.restarts:
+                continue
+
+            uptime = time.monotonic() - worker.started_at
+            worker.failures = 1 if uptime >= STABLE_AFTER else worker.failures + 1
+            logger.warning(
+                f"Cluster {worker.cluster_id} exited with code {worker.process.exitcode} "
+                f"after {uptime:.0f}s (failure {worker.failures})"
+            )
+            self.restarts.append(worker)
+
+    def restart_next(self):
+        """Restart the first queued worker once its backoff and the global spacing allow it"""
+        if not self.restarts:
+            return
+
+        worker = self.restarts[0]
+        backoff = min(300, self.restart_delay * 2 ** (worker.failures - 1))
+        now = time.monotonic()
+        if now - self.last_restart < self.restart_delay or now - worker.started_at < backoff:
+            return
+
+        self.restarts.popleft()
+        self.last_restart = now
+        self.spawn(worker)
+
+    def stop(self, *_):
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        # Stagger the initial start so shards don't all IDENTIFY at once
+        for worker in self.workers:
+            self.spawn(worker)
+            self.last_restart = time.monotonic()
+            time.sleep(0 if self.simulate else self.restart_delay)
+
+        while not self.stopping:
+            self.check()
+            self.restart_next()
+            time.sleep(1)
+
+        logger.info("Stopping cluster")
+        for worker in self.workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+        for worker in self.workers:
+            if worker.process is not None:
+                worker.process.join(timeout=30)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--shards", type=int, default=None,
+                        help="Total shard count (default: SHARD_COUNT or Discord's recommendation)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--restart-delay", type=float, default=5.0, help="Seconds between restarts")
+    parser.add_argument("--simulate", action="store_true",
+                        help="Run fake workers that crash at random to exercise shard assignment and restarts")
+    args = parser.parse_args()
+
+    load_dotenv()
+    shard_count = args.shards or int(os.environ.get("SHARD_COUNT") or 0)
+    if not shard_count:
+        if args.simulate:
+            shard_count = 8
+        else:
+            shard_count = recommended_shard_count(os.environ["BOT_TOKEN"])
+            logger.info(f"Discord recommends {shard_count} shards")
+
+    Supervisor(shard_count, args.workers, args.restart_delay, args.simulate).run()
+
+if __name__ == "__main__":
+    main()
@@ -17,11 +17,97 @@ class Config:
         self.cmd_prefix = os.environ.get("CMD_PREFIX", default="!")
         self.local_tz = os.environ.get("LOCAL_TZ", default="America/New_York")
 
+        # Sharding; the cluster launcher sets these for each worker process
+        shard_count = os.environ.get("SHARD_COUNT")
+        shard_ids = os.environ.get("SHARD_IDS")
+        self.shard_count = int(shard_count) if shard_count else None
+        self.shard_ids = [int(shard_id) for shard_id in shard_ids.split(",")] if shard_ids else None
+        self.cluster_id = int(os.environ.get("CLUSTER_ID", default=0))
+
+        # Database settings
+        self.db_pool_size = int(os.environ.get("DB_POOL_SIZE", default=100))
+        self.db_timeout_ms = int(os.environ.get("DB_TIMEOUT_MS", default=5000))
+        self.db_schema = os.environ.get("DB_SCHEMA", default="per_guild")
+        self.db_batch_size = int(os.environ.get("DB_BATCH_SIZE", default=1000))
+
+        # Pasta cache settings
+        self.pasta_cache_bytes = int(os.environ.get("PASTA_CACHE_BYTES", default=8 * 1024 * 1024))
+        self.pasta_cache_ttl = int(os.environ.get("PASTA_CACHE_TTL", default=3600))
+        self.pasta_cache_warm = os.environ.get("PASTA_CACHE_WARM", default="true").lower() == "true"
+
+        # "Did you mean" suggestions for unknown commands, 0 disables them
+        self.suggest_count = int(os.environ.get("SUGGEST_COUNT", default=3))
+        self.suggest_max_distance = int(os.environ.get("SUGGEST_MAX_DISTANCE", default=2))
+
+        # Largest file accepted by !import
+        self.import_max_bytes = int(os.environ.get("IMPORT_MAX_BYTES", default=8 * 1024 * 1024))
+
+        # Custom commands shown per !help page
+        self.help_page_lines = int(os.environ.get("HELP_PAGE_LINES", default=40))
+
+        # Recent messages remembered so !quote can skip fetching them, 0 disables the cache
+        self.quote_cache_messages = int(os.environ.get("QUOTE_CACHE_MESSAGES", default=100))
+        self.quote_cache_channels = int(os.environ.get("QUOTE_CACHE_CHANNELS", default=1000))
+
+        # Serve custom commands from on_message instead of the CommandNotFound error path
+        self.fast_pasta_path = os.environ.get("FAST_PASTA_PATH", default="true").lower() == "true"
+
+        # Cooldowns and spam limits in seconds, 0 disables a limit
+        self.script_cooldown = float(os.environ.get("SCRIPT_COOLDOWN", default=300))
+        self.script_user_cooldown = float(os.environ.get("SCRIPT_USER_COOLDOWN", default=0))
+        self.pasta_user_rate = int(os.environ.get("PASTA_USER_RATE", default=5))
+        self.pasta_user_per = float(os.environ.get("PASTA_USER_PER", default=10))
+        self.pasta_guild_rate = int(os.environ.get("PASTA_GUILD_RATE", default=30))
+        self.pasta_guild_per = float(os.environ.get("PASTA_GUILD_PER", default=10))
+        self.cooldown_persist = os.environ.get("COOLDOWN_PERSIST", default="true").lower() == "true"
+
+        # Custom command usage, counted in memory and written to the database in batches
+        self.usage_flush_interval = float(os.environ.get("USAGE_FLUSH_INTERVAL", default=60))
+        self.usage_retention_days = int(os.environ.get("USAGE_RETENTION_DAYS", default=90))
+        self.top_count = int(os.environ.get("TOP_COUNT", default=10))
+
+        # Gateway state kept in memory: "lean" keeps only what the bot uses, "full" discord.py's defaults
+        self.memory_profile = os.environ.get("MEMORY_PROFILE", default="lean")
+        # Comma-separated intents to turn on, or off with a leading "-", on top of the profile
+        self.intents = os.environ.get("INTENTS", default="")
+        # Comma-separated member cache flags, "all" or "none"; empty uses the profile's
+        self.member_cache = os.environ.get("MEMBER_CACHE", default="")
+        # Size of discord.py's message cache, 0 disables it; unset uses the profile's
+        max_messages = os.environ.get("MAX_MESSAGES")
+        self.max_messages = int(max_messages) if max_messages else None
+
+        # Outbound send scheduling
+        self.send_rate = int(os.environ.get("SEND_RATE", default=5))
+        self.send_per = float(os.environ.get("SEND_PER", default=5.0))
+        self.send_global_rate = int(os.environ.get("SEND_GLOBAL_RATE", default=50))
+        self.send_max_ratelimit_wait = float(os.environ.get("SEND_MAX_RATELIMIT_WAIT", default=30.0))
+
+        # Logging
+        self.log_format = os.environ.get("LOG_FORMAT", default="text")
+        self.message_log_sample_rate = float(os.environ.get("MESSAGE_LOG_SAMPLE_RATE", default=1.0))
+        self.message_log_verbosity = os.environ.get("MESSAGE_LOG_VERBOSITY", default="content")
+        self.message_log_guilds = os.environ.get("MESSAGE_LOG_GUILDS", default="")
+
+        # Keepalive/health server
+        self.keepalive_host = os.environ.get("KEEPALIVE_HOST", default="0.0.0.0")
+        self.keepalive_port = int(os.environ.get("KEEPALIVE_PORT", default=10000))
+
+        # Profile the bot for this many seconds after startup (0 disables)
+        self.profile_seconds = float(os.environ.get("PROFILE_SECONDS", default=0))
+        self.profile_dir = os.environ.get("PROFILE_DIR", default="profiles")
+
+        # Directory of text assets for easter eggs
+        self.assets_dir = os.environ.get("ASSETS_DIR", default="assets")
+
         # Discord limitations
-        self.max_message_len = os.environ.get("MAX_MESSAGE_LEN", default=2000)
+        self.max_message_len = int(os.environ.get("MAX_MESSAGE_LEN", default=2000))
 
         # Validate critical settings
         if not self.token:
             raise ValueError("BOT_TOKEN environment variable is not set")
         if not self.db_uri:
             raise ValueError("DATABASE_URI environment variable is not set")
+        if self.shard_ids and not self.shard_count:
+            raise ValueError("SHARD_COUNT must be set when SHARD_IDS is set")
+        if self.memory_profile not in ("lean", "full"):
+            raise ValueError("MEMORY_PROFILE must be 'lean' or 'full'")
@@ -1,58 +1,118 @@
-import threading
-from flask import Flask
-from werkzeug.serving import make_server
+import asyncio
+import logging
+import math
+import time
+
+from aiohttp import web
+
+logger = logging.getLogger("keepalive")
 
 class KeepAliveServer:
-    def __init__(self, host='0.0.0.0', port=10000):
+    def __init__(self, bot, host='0.0.0.0', port=10000):
         """
-        Initialize a Flask-based keepalive server.
-        
+        Initialize an asyncio keepalive server running on the bot's event loop.
+
         Args:
+            bot (PastaBot): The bot to report health and metrics for.
             host (str): Host to bind the server to. Defaults to '0.0.0.0'.
-            port (int): Port to run the server on. Defaults to 8080.
+            port (int): Port to run the server on. Defaults to 10000.
         """
-        self.flask_app = Flask(__name__)
-        self.flask_app.route('/')(self.keep_alive)
-        
+        self.bot = bot
         self.host = host
         self.port = port
-        self.server = None
-        self.thread = None
+
+        self.app = web.Application()
+        self.app.router.add_get('/', self.keep_alive)
+        self.app.router.add_get('/health', self.health)
+        self.app.router.add_get('/metrics', self.metrics)
+
+        self.runner = None
         self.is_running = False
 
-    def keep_alive(self):
+    async def keep_alive(self, request):
         """
         Simple route to respond to health checks.
-        
+
+        Returns:
+            web.Response: A response indicating the bot is alive.
+        """
+        return web.Response(text="Bot is alive!")
+
+    async def health(self, request):
+        """
+        Report real liveness of the gateway connection(s) and the database.
+
+        Returns:
+            web.Response: JSON health report, with status 503 if anything is down.
+        """
+        shards = {
+            shard_id: {
+                'closed': shard.is_closed(),
+                'latency': _finite(shard.latency),
+                'last_heartbeat_ack': _seconds_since_ack(getattr(getattr(shard, '_parent', None), 'ws', None)),
+            }
+            for shard_id, shard in getattr(self.bot, 'shards', {}).items()
+        }
+
+        try:
+            start = time.perf_counter()
+            await asyncio.wait_for(self.bot.db.ping(), timeout=5)
+            db = {'ok': True, 'latency': time.perf_counter() - start}
+        except Exception as e:
+            db = {'ok': False, 'error': str(e)}
+
+        report = {
+            'ready': self.bot.is_ready(),
+            'closed': self.bot.is_closed(),
+            'latency': _finite(self.bot.latency),
+            'last_heartbeat_ack': _seconds_since_ack(getattr(self.bot, 'ws', None)),
+            'shards': shards,
+            'guilds': len(self.bot.guilds),
+            'db': db,
+        }
+        healthy = report['ready'] and not report['closed'] and db['ok']
+        return web.json_response(report, status=200 if healthy else 503)
+
+    async def metrics(self, request):
+        """
+        Serve the bot's metrics in the Prometheus text format.
+
         Returns:
-            tuple: A response indicating the bot is alive.
+            web.Response: The rendered metrics.
         """
-        return "Bot is alive!", 200
+        return web.Response(text=self.bot.metrics.render(), content_type='text/plain', charset='utf-8')
 
-    def start(self):
+    async def start(self):
         """
-        Start the Flask server in a separate thread.
-        Ensures the server runs without blocking the main thread.
+        Start serving on the current event loop.
         """
         if not self.is_running:
             try:
-                self.server = make_server(self.host, self.port, self.flask_app)
-                self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
-                self.thread.start()
+                self.runner = web.AppRunner(self.app, access_log=None)
+                await self.runner.setup()
+                await web.TCPSite(self.runner, self.host, self.port).start()
                 self.is_running = True
-                print(f"Keepalive server started on {self.host}:{self.port}")
+                logger.info(f"Keepalive server started on {self.host}:{self.port}")
             except Exception as e:
-                print(f"Failed to start keepalive server: {e}")
+                logger.error(f"Failed to start keepalive server: {e}")
 
-    def stop(self):
+    async def stop(self):
         """
-        Stop the Flask server and clean up resources.
+        Stop the server and clean up resources.
         """
-        if self.is_running and self.server:
+        if self.is_running and self.runner:
             try:
-                self.server.shutdown()
-                self.thread.join()
+                await self.runner.cleanup()
                 self.is_running = False
-                print("Keepalive server stopped")
+                logger.info("Keepalive server stopped")
             except Exception as e:
-                print(f"Error stopping keepalive server: {e}")
\ No newline at end of file
+                logger.error(f"Error stopping keepalive server: {e}")
+
+def _finite(value):
+    """Map NaN/inf (e.g. latency before the first heartbeat) to None for JSON"""
+    return value if value is not None and math.isfinite(value) else None
+
+def _seconds_since_ack(ws):
+    """Get the seconds since a gateway websocket's last heartbeat ACK, or None"""
+    last_ack = getattr(getattr(ws, '_keep_alive', None), '_last_ack', None)
+    return time.perf_counter() - last_ack if last_ack is not None else None
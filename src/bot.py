@@ -1,55 +1,384 @@
 """Core bot class for Discord Pasta Bot"""
+import asyncio
 import logging
+import time
 import discord
 from discord.ext import commands
 
-from src.utils.db import Database
+from src.utils.db import create_database
+from src.utils.cache import PastaCache, MISSING
+from src.utils.cooldowns import CooldownStore, cooldown_key
+from src.utils.message_cache import MessageCache
+from src.utils.sender import SendScheduler
+from src.utils.assets import AssetLibrary
+from src.utils.metrics import MetricsRegistry
+from src.utils.instrumentation import Profiler
+from src.utils.lifecycle import ConnectionTracker
+from src.utils.memory_profile import gateway_options
+from src.utils.templates import TemplateError, compile_template
+from src.utils.usage import UsageCounters
 from src.events import setup as setup_events
 from src.commands import setup as setup_commands
 
 logger = logging.getLogger("bot.core")
 
-class PastaBot(commands.Bot):
+# Arguments filled into templated pastas may ping users, but never @everyone or roles
+TEMPLATE_MENTIONS = discord.AllowedMentions(everyone=False, roles=False, users=True)
+
+class PastaBot(commands.AutoShardedBot):
     """Main bot class"""
 
     def __init__(self, config):
         """Initialize the bot with configuration"""
         self.config = config
 
-        # Setup intents
-        intents = discord.Intents.default()
-        intents.message_content = True
-        intents.members = True
-
-        # Initialize bot with command prefix
+        # Initialize bot with command prefix, and the intents and caches of the memory profile
         super().__init__(
-            command_prefix=self.config.cmd_prefix, 
-            intents=intents, 
+            command_prefix=self.config.cmd_prefix,
             help_command=None,
-            chunk_guilds_at_startup=False
+            chunk_guilds_at_startup=False,
+            # None lets discord.py pick the recommended shard count and run every shard
+            shard_count=self.config.shard_count,
+            shard_ids=self.config.shard_ids,
+            # Surface long rate limits to the send scheduler instead of sleeping inside discord.py
+            max_ratelimit_timeout=self.config.send_max_ratelimit_wait,
+            **gateway_options(self.config)
+        )
+
+        # Database client; connections are opened by prepare_database alongside the gateway login
+        self.db = create_database(self.config)
+        self.db_ready = None
+        self.setup_done = False
+
+        # Cache pasta content in front of the database
+        self.pasta_cache = PastaCache(
+            max_bytes=self.config.pasta_cache_bytes,
+            ttl=self.config.pasta_cache_ttl
+        )
+
+        # Recently seen messages per channel, so quotes rarely need fetch_message
+        self.recent_messages = MessageCache(
+            per_channel=self.config.quote_cache_messages,
+            max_channels=self.config.quote_cache_channels
+        )
+
+        # Per-guild settings, loaded lazily from the database
+        self.guild_settings = {}
+
+        # Queue for outbound messages
+        self.sender = SendScheduler(
+            rate=self.config.send_rate,
+            per=self.config.send_per,
+            global_rate=self.config.send_global_rate
         )
 
-        # Connect to database
-        self.db = Database(self.config.db_uri)
+        # Easter egg scripts, loaded and pre-chunked once at startup
+        self.scripts = AssetLibrary(self.config.assets_dir, self.config.max_message_len)
+
+        # Metrics served on the keepalive server's /metrics page
+        self.metrics = MetricsRegistry()
+        self.setup_metrics()
+        self.connections = ConnectionTracker(self.metrics)
+        self.profiler = Profiler(self.config.profile_dir)
+
+        # Cooldowns and spam limits, see cooldown_key for the bucket names
+        self.cooldowns = CooldownStore()
 
-        # Cooldowns for easter eggs
-        self.cooldowns = {}
+        # Custom command uses waiting to be written, and the task writing them
+        self.usage = UsageCounters()
+        self.usage_flusher = None
+        self.usage_stopping = asyncio.Event()
 
     async def setup_hook(self):
         """Set up all cogs and event handlers"""
+        # Normally already started by login
+        self.prepare_database()
+
+        # login() runs this again whenever the lifecycle manager restarts the gateway
+        if self.setup_done:
+            return
+        self.setup_done = True
+
         # Set up command cogs
         await setup_commands(self)
 
         # Set up events
         setup_events(self)
 
-        
+        # Write usage counters in the background until shutdown
+        self.usage_flusher = asyncio.create_task(self.flush_usage_periodically())
+
+        # Profile startup and the first moments of traffic if requested
+        if self.config.profile_seconds:
+            asyncio.create_task(self.profiler.run(self.config.profile_seconds))
+
+    async def login(self, token):
+        """Log in to Discord while the database connects in the background"""
+        self.prepare_database()
+        await super().login(token)
+
+    def prepare_database(self):
+        """Start connecting to the database, creating indexes and loading cooldowns, once"""
+        if self.db_ready is None:
+            self.db_ready = asyncio.create_task(self._prepare_database())
+        return self.db_ready
+
+    async def _prepare_database(self):
+        """Returns whether the database was set up, so db_ready can be checked"""
+        start = time.perf_counter()
+        try:
+            await self.db.connect()
+            await self.db.ensure_indexes()
+
+            # Pick up cooldowns that were still running when the bot last stopped
+            if self.config.cooldown_persist:
+                self.cooldowns.load(await self.db.get_cooldowns())
+        except Exception as e:
+            # Lookups report their own errors, so a slow or missing database doesn't hold up the gateway
+            logger.error(f"Database setup failed: {e}")
+            return False
+        logger.info(f"Database ready in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return True
+
+    async def flush_usage(self):
+        """Write the command uses counted since the last flush to the database in one batch"""
+        pending = self.usage.take_pending()
+        if not pending:
+            return
+        try:
+            await self.db.save_usage(pending)
+        except Exception as e:
+            # Keep the counts for the next flush rather than losing them
+            logger.error(f"Could not save command usage: {e}")
+            self.usage.restore(pending)
+
+    async def flush_usage_periodically(self):
+        """Flush usage counters every USAGE_FLUSH_INTERVAL seconds, and once more when told to stop"""
+        await self.db_ready
+        while not self.usage_stopping.is_set():
+            try:
+                await asyncio.wait_for(self.usage_stopping.wait(), timeout=self.config.usage_flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush_usage()
+
+    def setup_metrics(self):
+        """Register metrics that are read from the bot's state at scrape time"""
+        self.metrics.gauge(
+            "discord_gateway_latency_seconds", "Latency between a heartbeat and its ACK",
+            lambda: self.latency
+        )
+        self.metrics.gauge("discord_guilds", "Number of guilds the bot is in", lambda: len(self.guilds))
+        self.metrics.gauge(
+            "discord_cached_members", "Members held in discord.py's member cache",
+            lambda: sum(len(guild.members) for guild in self.guilds)
+        )
+        self.metrics.gauge(
+            "discord_cached_messages", "Messages held in discord.py's message cache",
+            lambda: len(self.cached_messages)
+        )
+        for stat in ("hits", "misses", "evictions", "entries", "bytes"):
+            self.metrics.gauge(
+                f"pasta_cache_{stat}", f"Pasta cache {stat}",
+                lambda stat=stat: self.pasta_cache.stats()[stat]
+            )
+        self.metrics.gauge("pasta_cache_hit_rate", "Pasta cache hit rate", lambda: self.pasta_cache.stats()['hit_rate'])
+        self.metrics.gauge("send_queue_sent", "Messages sent by the send scheduler", lambda: self.sender.sent)
+        self.metrics.gauge("send_queue_rate_limited", "Rate limits hit by the send scheduler", lambda: self.sender.rate_limited)
+        self.metrics.gauge(
+            "usage_pending", "Custom command usage counters waiting to be written", lambda: len(self.usage)
+        )
+
+    async def get_pasta(self, guild_id, command):
+        """Get a custom command's content, or None if it doesn't exist"""
+        content = self.pasta_cache.get(guild_id, command)
+        if content is MISSING:
+            document = await self.db.get_command(guild_id, command)
+            content = document['content'] if document is not None else None
+            self.pasta_cache.put(guild_id, command, content)
+        return content
+
+    def is_pasta_rate_limited(self, message):
+        """Count a custom command use against its user's and guild's spam limits"""
+        limits = (
+            ("user", cooldown_key("pasta_user", message.guild.id, message.author.id),
+             self.config.pasta_user_rate, self.config.pasta_user_per),
+            ("guild", cooldown_key("pasta_guild", message.guild.id),
+             self.config.pasta_guild_rate, self.config.pasta_guild_per),
+        )
+        for scope, key, rate, per in limits:
+            if self.cooldowns.check(key, rate, per):
+                self.metrics.counter(
+                    "pasta_rate_limited_total", "Custom command uses dropped by spam limits", ("scope",)
+                ).inc(scope)
+                return True
+        # Only counted once every limit has room, so a use dropped by one limit isn't charged to the other
+        for _, key, rate, per in limits:
+            self.cooldowns.hit(key, rate, per)
+        return False
+
+    async def save_cooldowns(self):
+        """Write cooldowns that changed since the last save to the database"""
+        if not self.config.cooldown_persist:
+            return
+        dirty = self.cooldowns.take_dirty()
+        try:
+            await self.db.save_cooldowns(dirty)
+        except Exception as e:
+            # The cooldowns still apply in memory; keep them for the next save
+            logger.error(f"Could not save cooldowns: {e}")
+            self.cooldowns.restore_dirty(dirty)
+
+    async def get_use_count(self, guild_id, command):
+        """Get how often a command has been used, from the stored usage rollups plus uses not yet written"""
+        count = self.usage.total(guild_id, command)
+        if count is not None:
+            return count
+
+        # Loaded once per command, then kept up to date by UsageCounters.hit
+        since = time.time() - self.config.usage_retention_days * 86400
+        try:
+            stored = await self.db.get_usage(guild_id, since, command)
+        except Exception as e:
+            logger.error(f"Could not load usage of '{command}': {e}")
+            return self.usage.pending_uses(guild_id, command)
+        return self.usage.track_total(guild_id, command, sum(stored.values()))
+
+    async def render_pasta(self, message, command, content, args=""):
+        """
+        Fill in a templated pasta's placeholders for one use.
+
+        Returns:
+            tuple: The text to send and its allowed mentions, or None to use the defaults.
+        """
+        try:
+            template = compile_template(content)
+        except TemplateError:
+            # Added before templates were validated, so it's sent as written
+            return content, None
+        if template is None:
+            return content, None
+
+        count = await self.get_use_count(message.guild.id, command) if template.uses_count else 0
+        text = template.render(message, args, count, self.config.max_message_len)
+
+        # Discord rejects empty messages, e.g. a pasta of just {arg1} used without arguments
+        if not text.strip():
+            return content, None
+        return text, TEMPLATE_MENTIONS
+
+    async def serve_pasta(self, message, command, args=""):
+        """Reply to a message with a custom command's content, or an error if it doesn't exist"""
+        # Spammed commands are dropped silently, since replying would only add to the spam
+        if self.is_pasta_rate_limited(message):
+            logger.debug(f"Dropped '{command}' from {message.author.id} over the spam limit")
+            return
+
+        content = await self.get_pasta(message.guild.id, command)
+
+        self.metrics.counter(
+            "pasta_requests_total", "Custom command lookups by result", ("result",)
+        ).inc("hit" if content is not None else "miss")
+
+        if content is not None:
+            self.usage.hit(message.guild.id, command)
+            text, allowed_mentions = await self.render_pasta(message, command, content, args)
+            await self.sender.send(message.channel, text, allowed_mentions=allowed_mentions)
+            latency = (discord.utils.utcnow() - message.created_at).total_seconds() * 1000
+            logger.debug(f"Served pasta '{command}' {latency:.1f} ms after message creation")
+        else:
+            prefix = self.config.cmd_prefix
+            error = f"ERROR: Message starts with '{prefix}' but I don't recognize this command."
+            suggestions = self.pasta_cache.suggest(
+                message.guild.id, command,
+                max_distance=self.config.suggest_max_distance,
+                k=self.config.suggest_count
+            ) if self.config.suggest_count else []
+            if suggestions:
+                error += " Did you mean " + ", ".join(f"{prefix}{name}" for name in suggestions) + "?"
+            await self.sender.send(
+                message.channel,
+                f"{error} Use {prefix}help or {prefix}commands to see what's available."
+            )
+
+    async def add_pasta(self, guild_id, command, content):
+        """Add or update a custom command, writing through to the cache"""
+        is_new = await self.db.add_command(guild_id, command, content)
+        self.pasta_cache.put(guild_id, command, content)
+        self.dispatch("pasta_changed", guild_id, command)
+        return is_new
+
+    async def add_pastas(self, guild_id, pastas):
+        """Add or update many custom commands at once, refreshing the guild's cache"""
+        count = await self.db.add_commands(guild_id, pastas, batch_size=self.config.db_batch_size)
+        warmed = self.pasta_cache.get_names(guild_id) is not None
+        self.pasta_cache.drop_guild(guild_id)
+        if warmed:
+            await self.warm_pasta_cache(guild_id)
+        self.dispatch("pasta_changed", guild_id, None)
+        return count
+
+    async def remove_pasta(self, guild_id, command):
+        """Remove a custom command, invalidating the cache"""
+        success = await self.db.remove_command(guild_id, command)
+        self.pasta_cache.invalidate(guild_id, command)
+        self.dispatch("pasta_changed", guild_id, command)
+        return success
+
+    async def warm_pasta_cache(self, guild_id):
+        """Load every command of a guild into the cache"""
+        documents = await self.db.get_all_commands(guild_id)
+        self.pasta_cache.load_guild(guild_id, documents)
+
+    async def get_guild_settings(self, guild_id):
+        """Get a guild's settings, loading them from the database on first use"""
+        settings = self.guild_settings.get(guild_id)
+        if settings is None:
+            settings = await self.db.get_guild_settings(guild_id)
+            self.guild_settings[guild_id] = settings
+        return settings
+
+    async def update_guild_settings(self, guild_id, **settings):
+        """Update a guild's settings in the database and in memory"""
+        await self.db.update_guild_settings(guild_id, settings)
+        (await self.get_guild_settings(guild_id)).update(settings)
+
+    async def set_user_timezone(self, guild_id, user_id, timezone):
+        """Set or, with None, reset a user's timezone in the database and in memory"""
+        await self.db.set_user_timezone(guild_id, user_id, timezone)
+        user_timezones = (await self.get_guild_settings(guild_id)).setdefault('user_timezones', {})
+        if timezone is None:
+            user_timezones.pop(str(user_id), None)
+        else:
+            user_timezones[str(user_id)] = timezone
+
+    async def get_timezone(self, guild_id, user_id=None):
+        """Get the timezone for a user in a guild, falling back to the guild's and then LOCAL_TZ"""
+        settings = await self.get_guild_settings(guild_id)
+        if user_id is not None:
+            timezone = settings.get('user_timezones', {}).get(str(user_id))
+            if timezone:
+                return timezone
+        return settings.get('timezone') or self.config.local_tz
 
     async def run_bot(self):
         """Run the bot"""
         logger.info("Starting bot")
         await self.start(self.config.token)
 
-    def close(self):
-        """Close all connections"""
-        self.db.close()
+    async def shutdown(self):
+        """Close everything for good: the gateway, then the database after saving what's pending"""
+        await self.close()
+        await self.sender.close()
+        if self.db_ready is not None and not self.db_ready.done():
+            self.db_ready.cancel()
+        if self.usage_flusher is not None:
+            # Not cancelled: a batch it's writing has already left the counters and would be lost
+            self.usage_stopping.set()
+            await asyncio.gather(self.usage_flusher, return_exceptions=True)
+        try:
+            # flush_usage logs its own errors, so it can't keep the cooldowns from being saved
+            await self.flush_usage()
+            await self.save_cooldowns()
+        finally:
+            await self.db.close()
@@ -4,10 +4,12 @@ from discord.ext import commands
 from src.commands.admin import setup as setup_admin
 from src.commands.quotes import setup as setup_quotes
 from src.commands.help import setup as setup_help
+from src.commands.debug import setup as setup_debug
 
 # You could also include a setup_all function to load all commands at once
 async def setup(bot: commands.Bot):
     """Set up all command modules for the bot"""
     await setup_admin(bot)
     await setup_quotes(bot)
-    await setup_help(bot)
\ No newline at end of file
+    await setup_help(bot)
+    await setup_debug(bot)
\ No newline at end of file
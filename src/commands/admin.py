@@ -1,8 +1,15 @@
 """Admin commands for the bot"""
+import io
+import json
 import logging
+import time
 import discord
 from discord.ext import commands
 
+from src.utils.templates import TemplateError, compile_template
+from src.utils.timestamp import is_valid_timezone
+from src.utils.usage import HOUR, usage_hour
+
 logger = logging.getLogger("bot.commands.admin")
 
 class AdminCommands(commands.Cog):
@@ -13,45 +20,57 @@ class AdminCommands(commands.Cog):
         self.db = bot.db
         self.config = bot.config
     
-    @commands.command(name="add")
-    @commands.has_permissions(administrator=True)
-    async def add_cmd(self, ctx, command: str = None, *, pasta: str = None):
-        """Add a custom command to the bot"""
-        if not command or not pasta:
-            await ctx.send(f"ERROR: Invalid format. Use {self.config.cmd_prefix}add <command> <response text>")
-            return
-
-        # Remove prefix if it's included in the command
+    def strip_prefix(self, command):
+        """Remove CMD_PREFIX from a command name if it's included"""
         if command.startswith(self.config.cmd_prefix):
-            command = command[len(self.config.cmd_prefix):]
+            return command[len(self.config.cmd_prefix):]
+        return command
 
+    def validate_pasta(self, command, pasta):
+        """Check a custom command before it's stored, returning an error message or None"""
         # Check if command is valid
-        built_in_commands = self.bot.commands
-        built_in_commands_and_aliases = [
-            cmd.name for cmd in built_in_commands
-        ] + [
-            alias for cmd in built_in_commands for alias in cmd.aliases
-        ]
-        
-        if command in built_in_commands_and_aliases:
-            await ctx.send("ERROR: Cannot override hardcoded commands.")
-            return
+        if command in self.bot.all_commands:
+            return "Cannot override hardcoded commands."
 
         if not command.strip() or not command.isalnum():
-            await ctx.send("ERROR: Command must be alphanumeric with no spaces.")
-            return
+            return "Command must be alphanumeric with no spaces."
 
         if len(self.config.cmd_prefix + "remove " + command) >= self.config.max_message_len:
-            await ctx.send("ERROR: Command is too long.")
-            return
+            return "Command is too long."
+
+        if not pasta:
+            return "Command response cannot be empty."
 
         # Check that pasta doesn't start with CMD_PREFIX
         if pasta.startswith(self.config.cmd_prefix):
-            await ctx.send(f"ERROR: Command response cannot start with {self.config.cmd_prefix}")
+            return f"Command response cannot start with {self.config.cmd_prefix}"
+
+        # Compiling here also caches the render plan for when the command is used
+        try:
+            compile_template(pasta)
+        except TemplateError as e:
+            return str(e)
+
+        return None
+
+    @commands.command(name="add")
+    @commands.has_permissions(administrator=True)
+    async def add_cmd(self, ctx, command: str = None, *, pasta: str = None):
+        """Add a custom command to the bot"""
+        if not command or not pasta:
+            await ctx.send(f"ERROR: Invalid format. Use {self.config.cmd_prefix}add <command> <response text>")
+            return
+
+        # Remove prefix if it's included in the command
+        command = self.strip_prefix(command)
+
+        error = self.validate_pasta(command, pasta)
+        if error:
+            await ctx.send(f"ERROR: {error}")
             return
 
         # Add command to database
-        is_new = self.db.add_command(ctx.guild.id, command, pasta)
+        is_new = await self.bot.add_pasta(ctx.guild.id, command, pasta)
 
         # Send appropriate response
         if is_new:
@@ -75,7 +94,7 @@ class AdminCommands(commands.Cog):
             command = command[len(self.config.cmd_prefix):]
 
         # Remove command from database
-        success = self.db.remove_command(ctx.guild.id, command)
+        success = await self.bot.remove_pasta(ctx.guild.id, command)
 
         if not success:
             await ctx.send(
@@ -85,6 +104,105 @@ class AdminCommands(commands.Cog):
         else:
             await ctx.send(f"SUCCESS: Command '{self.config.cmd_prefix}{command}' has been removed")
 
+    @commands.command(name="export")
+    @commands.has_permissions(administrator=True)
+    async def export_cmds(self, ctx):
+        """Export all custom commands of the server as a JSONL file"""
+        buffer = io.BytesIO()
+        count = 0
+        async for document in self.db.iter_commands(ctx.guild.id):
+            line = json.dumps({'name': document['_id'], 'content': document['content']}, ensure_ascii=False, separators=(',', ':'))
+            buffer.write(line.encode() + b"\n")
+            count += 1
+
+        buffer.seek(0)
+        await ctx.send(
+            f"SUCCESS: Exported {count} commands",
+            file=discord.File(buffer, filename=f"pastas-{ctx.guild.id}.jsonl")
+        )
+
+    def parse_import(self, data):
+        """
+        Parse and validate an exported JSONL file.
+
+        Returns:
+            tuple: Dict of command names to content, and a list of error messages.
+        """
+        pastas = {}
+        errors = []
+
+        try:
+            lines = data.decode().splitlines()
+        except UnicodeDecodeError:
+            return pastas, ["File is not valid UTF-8"]
+
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                command, pasta = entry['name'], entry['content']
+                if not isinstance(command, str) or not isinstance(pasta, str):
+                    raise TypeError
+            except (ValueError, KeyError, TypeError):
+                errors.append(f"line {number}: expected {{\"name\": ..., \"content\": ...}}")
+                continue
+
+            command = self.strip_prefix(command)
+            error = self.validate_pasta(command, pasta)
+            if error:
+                errors.append(f"line {number} ({command}): {error}")
+            else:
+                pastas[command] = pasta
+
+        return pastas, errors
+
+    def summarize(self, header, lines):
+        """Join lines under a header, cutting them off to fit in a single message"""
+        message = header
+        for i, line in enumerate(lines):
+            more = f"\n... and {len(lines) - i} more"
+            if len(message) + len(line) + 1 + len(more) > self.config.max_message_len:
+                return message + more
+            message += "\n" + line
+        return message
+
+    @commands.command(name="import")
+    @commands.has_permissions(administrator=True)
+    async def import_cmds(self, ctx, mode: str = None):
+        """Import custom commands from an attached JSONL file, optionally as a dry run"""
+        if mode not in (None, "dryrun") or not ctx.message.attachments:
+            await ctx.send(
+                f"ERROR: Invalid format. Attach a file exported with {self.config.cmd_prefix}export "
+                f"and use {self.config.cmd_prefix}import [dryrun]"
+            )
+            return
+
+        attachment = ctx.message.attachments[0]
+        if attachment.size > self.config.import_max_bytes:
+            await ctx.send(f"ERROR: File is too large, the limit is {self.config.import_max_bytes} bytes")
+            return
+
+        # Validate everything up front so nothing is written if any command is invalid
+        pastas, errors = self.parse_import(await attachment.read())
+        if errors:
+            await ctx.send(self.summarize(f"ERROR: Nothing was imported, {len(errors)} invalid commands:", errors))
+            return
+
+        existing = {document['_id']: document['content'] async for document in self.db.iter_commands(ctx.guild.id)}
+        added = [command for command in pastas if command not in existing]
+        changed = [command for command in pastas if command in existing and existing[command] != pastas[command]]
+        summary = f"{len(added)} added, {len(changed)} replaced, {len(pastas) - len(added) - len(changed)} unchanged"
+
+        if mode == "dryrun":
+            diff = [f"+ {self.config.cmd_prefix}{command}" for command in added]
+            diff += [f"~ {self.config.cmd_prefix}{command}" for command in changed]
+            await ctx.send(self.summarize(f"DRY RUN: Importing would leave {summary}", diff))
+            return
+
+        await self.bot.add_pastas(ctx.guild.id, {command: pastas[command] for command in added + changed})
+        await ctx.send(f"SUCCESS: Imported commands: {summary}")
+
     @commands.command(name="changegame")
     @commands.has_permissions(administrator=True)
     async def change_game(self, ctx, *, game: str = None):
@@ -112,6 +230,100 @@ class AdminCommands(commands.Cog):
         except Exception as e:
             await ctx.send(f"ERROR: Could not change nickname: {e}")
 
+    @commands.command(name="eastereggs")
+    @commands.has_permissions(administrator=True)
+    async def toggle_easter_eggs(self, ctx, state: str = None, script: str = None):
+        """Turn easter egg scripts on or off for the server"""
+        if state not in ("on", "off"):
+            await ctx.send(f"ERROR: Invalid format. Use {self.config.cmd_prefix}eastereggs <on|off> [script]")
+            return
+
+        if script is not None and self.bot.scripts.get(script) is None:
+            await ctx.send(f"ERROR: Unknown script '{script}'")
+            return
+
+        settings = await self.bot.get_guild_settings(ctx.guild.id)
+        disabled = set(settings.get('disabled_scripts', ()))
+        targets = [script] if script is not None else list(self.bot.scripts)
+
+        if state == "on":
+            disabled.difference_update(targets)
+        else:
+            disabled.update(targets)
+
+        await self.bot.update_guild_settings(ctx.guild.id, disabled_scripts=sorted(disabled))
+        await ctx.send(f"SUCCESS: Turned {state} {'easter egg ' + script if script else 'all easter eggs'}")
+
+    @commands.command(name="servertimezone")
+    @commands.has_permissions(administrator=True)
+    async def set_server_timezone(self, ctx, timezone: str = None):
+        """Set the default timezone used for quote timestamps in the server"""
+        if not timezone:
+            await ctx.send(f"ERROR: Invalid format. Use {self.config.cmd_prefix}servertimezone <timezone>")
+            return
+
+        if not is_valid_timezone(timezone):
+            await ctx.send(f"ERROR: Unknown timezone '{timezone}'. Use a name like America/New_York")
+            return
+
+        await self.bot.update_guild_settings(ctx.guild.id, timezone=timezone)
+        await ctx.send(f"SUCCESS: Server timezone set to {timezone}")
+
+    @commands.command(name="cachestats")
+    @commands.has_permissions(administrator=True)
+    async def cache_stats(self, ctx):
+        """Show pasta cache hit/miss statistics"""
+        stats = self.bot.pasta_cache.stats()
+        await ctx.send(
+            f"Pasta cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.1%} hit rate), {stats['entries']} entries, "
+            f"{stats['bytes']} bytes, {stats['evictions']} evictions, "
+            f"{stats['guilds_warmed']} guilds warmed"
+        )
+
+    @commands.command(name="top")
+    @commands.has_permissions(administrator=True)
+    async def top_cmds(self, ctx, days: str = None):
+        """Show the server's most used custom commands"""
+        retention = self.config.usage_retention_days
+        if days is not None and (not days.isdigit() or not 1 <= int(days) <= retention):
+            await ctx.send(f"ERROR: Invalid format. Use {self.config.cmd_prefix}top [days], with up to {retention} days")
+            return
+        days = int(days) if days is not None else 7
+
+        # Include uses that are still waiting to be written
+        await self.bot.flush_usage()
+        since = usage_hour(time.time()) - (days * 24 - 1) * HOUR
+        top = await self.db.get_top_commands(ctx.guild.id, since, self.config.top_count)
+        if not top:
+            await ctx.send(f"No custom commands were used in the last {days} days")
+            return
+
+        lines = [
+            f"{rank}. {self.config.cmd_prefix}{command} - {uses} use{'s' if uses != 1 else ''}"
+            for rank, (command, uses) in enumerate(top, start=1)
+        ]
+        await ctx.send(self.summarize(f"Most used commands in the last {days} days:", lines))
+
+    @commands.command(name="stats")
+    @commands.has_permissions(administrator=True)
+    async def usage_stats(self, ctx, command: str = None):
+        """Show how often the server's custom commands, or one of them, were used recently"""
+        if command is not None:
+            command = self.strip_prefix(command)
+
+        # Include uses that are still waiting to be written
+        await self.bot.flush_usage()
+        now = usage_hour(time.time())
+        hours = await self.db.get_usage(ctx.guild.id, now - (30 * 24 - 1) * HOUR, command)
+        day, week, month = (
+            sum(uses for hour, uses in hours.items() if hour > now - days * 24 * HOUR)
+            for days in (1, 7, 30)
+        )
+
+        subject = f"{self.config.cmd_prefix}{command}" if command else "all custom commands"
+        await ctx.send(f"Uses of {subject} - last day: {day}, last 7 days: {week}, last 30 days: {month}")
+
 async def setup(bot):
     """Add the admin commands to the bot"""
     await bot.add_cog(AdminCommands(bot))
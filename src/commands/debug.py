@@ -0,0 +1,51 @@
+"""Debugging commands for the Discord Pasta Bot"""
+import logging
+import discord
+from discord.ext import commands
+
+logger = logging.getLogger("bot.commands.debug")
+
+# Longest profile that can be requested, in seconds
+MAX_PROFILE_SECONDS = 300
+
+class DebugCommands(commands.Cog):
+    """Commands for inspecting the running bot"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.config = bot.config
+
+    @commands.group(name="debug", invoke_without_command=True)
+    @commands.is_owner()
+    async def debug(self, ctx):
+        """Debugging commands for the bot owner"""
+        await ctx.send(f"ERROR: Invalid format. Use {self.config.cmd_prefix}debug profile <seconds>")
+
+    @debug.command(name="profile")
+    @commands.is_owner()
+    async def profile(self, ctx, duration: str = "30s"):
+        """Profile the bot for a number of seconds and upload the pstats file"""
+        try:
+            seconds = float(duration.rstrip("s"))
+        except ValueError:
+            seconds = 0
+
+        if not 0 < seconds <= MAX_PROFILE_SECONDS:
+            await ctx.send(f"ERROR: Duration must be between 0 and {MAX_PROFILE_SECONDS} seconds")
+            return
+
+        if self.bot.profiler.running:
+            await ctx.send("ERROR: A profile is already running")
+            return
+
+        await ctx.send(f"Profiling for {seconds:g} seconds...")
+        path, summary = await self.bot.profiler.run(seconds)
+
+        # Keep the summary inside a single message, code block included
+        summary = summary.strip()[:self.config.max_message_len - 8]
+        await ctx.send(f"```\n{summary}\n```", file=discord.File(path))
+
+async def setup(bot):
+    """Add the debug commands to the bot"""
+    await bot.add_cog(DebugCommands(bot))
+    logger.info("Debug commands cog loaded")
@@ -1,9 +1,84 @@
 """Help and command listing commands for the Discord Pasta Bot"""
 import logging
+import discord
 from discord.ext import commands
 
+from src.utils.instrumentation import instrument
+
 logger = logging.getLogger("bot.commands.help")
 
+# Discord's limit on the length of an embed description
+EMBED_DESCRIPTION_LIMIT = 4096
+
+def render_pages(names, prefix, max_chars=EMBED_DESCRIPTION_LIMIT, max_lines=40):
+    """
+    Render command names into pages for an embed description.
+
+    :param names: Iterable of command names, in display order.
+    :param prefix: The command prefix shown before each name.
+    :param max_chars: Maximum characters per page.
+    :param max_lines: Maximum commands per page.
+    :return: A tuple of page strings; empty if there are no names.
+    """
+    pages = []
+    lines = []
+    length = 0
+
+    for name in names:
+        line = f"{prefix}{name}"
+        if lines and (length + len(line) + 1 > max_chars or len(lines) >= max_lines):
+            pages.append("\n".join(lines))
+            lines = []
+            length = 0
+        lines.append(line)
+        length += len(line) + 1
+
+    if lines:
+        pages.append("\n".join(lines))
+
+    return tuple(pages)
+
+class HelpView(discord.ui.View):
+    """Previous/next buttons for flipping through help pages"""
+
+    def __init__(self, title, pages, timeout=300):
+        super().__init__(timeout=timeout)
+        self.title = title
+        self.pages = pages
+        self.page = 0
+        self.message = None
+        self.update_buttons()
+
+    def embed(self):
+        """Build the embed for the current page"""
+        embed = discord.Embed(title=self.title, description=self.pages[self.page])
+        embed.set_footer(text=f"Page {self.page + 1}/{len(self.pages)}")
+        return embed
+
+    def update_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page == len(self.pages) - 1
+
+    async def flip(self, interaction, step):
+        self.page = max(0, min(len(self.pages) - 1, self.page + step))
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction, button):
+        await self.flip(interaction, -1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        await self.flip(interaction, 1)
+
+    async def on_timeout(self):
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
 class HelpCommands(commands.Cog):
     """Commands for listing available bot commands"""
 
@@ -12,43 +87,62 @@ class HelpCommands(commands.Cog):
         self.db = bot.db
         self.config = bot.config
 
+        # Rendered custom command pages per guild, dropped whenever a command changes
+        self.pages = {}
+
+        prefix = self.config.cmd_prefix
+        self.built_in_page = (
+            "**Built-in commands:**\n"
+            f"{prefix}add <command> <response> - Add a new command, with optional {{user}}, {{mention}}, {{channel}}, {{arg1}}, {{random:a|b}} or {{count}}\n"
+            f"{prefix}remove <command> - Remove a command\n"
+            f"{prefix}export - Export all commands as a file\n"
+            f"{prefix}import [dryrun] - Import commands from an attached export file\n"
+            f"{prefix}changegame <game> - Change bot's playing status\n"
+            f"{prefix}changenick <nickname> - Change bot's nickname\n"
+            f"{prefix}eastereggs <on|off> [script] - Toggle easter eggs\n"
+            f"{prefix}servertimezone <timezone> - Set the server's timezone for quotes\n"
+            f"{prefix}cachestats - Show pasta cache statistics\n"
+            f"{prefix}top [days] - Show the most used commands\n"
+            f"{prefix}stats [command] - Show how often commands were used recently\n"
+            f"{prefix}quote [count] - Quote a message, or the last [count] messages up to it (use by replying to a message)\n"
+            f"{prefix}timezone [timezone|reset] - Show or set your timezone for quotes\n"
+            f"{prefix}commands or {prefix}help - Show this help message"
+        )
+
+    async def get_pages(self, guild_id):
+        """Get the rendered custom command pages of a guild, rendering them on first use"""
+        pages = self.pages.get(guild_id)
+        if pages is None:
+            names = self.bot.pasta_cache.get_names(guild_id)
+            if names is not None:
+                names = sorted(names)
+            else:
+                names = [name async for name in self.db.iter_command_names(guild_id)]
+
+            pages = render_pages(names, self.config.cmd_prefix, max_lines=self.config.help_page_lines)
+            self.pages[guild_id] = pages
+        return pages
+
+    @commands.Cog.listener()
+    async def on_pasta_changed(self, guild_id, command):
+        self.pages.pop(guild_id, None)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.pages.pop(guild.id, None)
+
     @commands.command(name="commands", aliases=["help"])
+    @instrument("command")
     async def get_cmds(self, ctx):
         """List all available commands"""
-        header = f"{ctx.guild.name} commands:"
-        await ctx.send(header)
-
-        # Get built-in commands
-        built_in_commands = "Built-in commands:\n"
-        built_in_commands += f"{self.config.cmd_prefix}add <command> <response> - Add a new command\n"
-        built_in_commands += f"{self.config.cmd_prefix}remove <command> - Remove a command\n"
-        built_in_commands += f"{self.config.cmd_prefix}changegame <game> - Change bot's playing status\n"
-        built_in_commands += f"{self.config.cmd_prefix}changenick <nickname> - Change bot's nickname\n"
-        built_in_commands += f"{self.config.cmd_prefix}quote - Quote a message (use by replying to a message)\n"
-        built_in_commands += f"{self.config.cmd_prefix}commands or {self.config.cmd_prefix}help - Show this help message\n\n"
-        await ctx.send(built_in_commands)
-
-        # Get custom commands from database
-        cmds = self.db.get_all_commands(ctx.guild.id)
-
-        has_any_custom_commands = False
-        custom_commands = "Custom commands:\n"
-        temp = ""
-
-        for command in cmds:
-            line = f"{self.config.cmd_prefix}{command['_id']}\n"
-            if has_any_custom_commands is False:
-                has_any_custom_commands = True
-                await ctx.send(custom_commands)
-            if len(custom_commands + temp + line) > self.config.max_message_len:
-                await ctx.send(temp)
-                temp = ""
-            temp += line
-
-        if temp:
-            await ctx.send(temp)
-        elif not has_any_custom_commands:
-            await ctx.send("No custom commands have been added yet.")
+        custom_pages = await self.get_pages(ctx.guild.id)
+        if custom_pages:
+            custom_pages = tuple(f"**Custom commands:**\n{page}" for page in custom_pages)
+        else:
+            custom_pages = ("No custom commands have been added yet.",)
+
+        view = HelpView(f"{ctx.guild.name} commands", (self.built_in_page,) + custom_pages)
+        view.message = await self.bot.sender.send(ctx.channel, embed=view.embed(), view=view)
 
 async def setup(bot):
     """Add the help commands to the bot"""
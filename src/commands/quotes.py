@@ -1,12 +1,62 @@
 """Quote commands for the Discord Pasta Bot"""
+import asyncio
 import logging
 import discord
 from discord.ext import commands
 
-from src.utils.timestamp import format_date_for_quotes
+from src.utils.instrumentation import instrument, io_timer
+from src.utils.timestamp import format_date_for_quotes, format_dates_for_quotes, is_valid_timezone
 
 logger = logging.getLogger("bot.commands.quotes")
 
+# Discord limits for embeds in a single message
+EMBED_DESCRIPTION_LIMIT = 4096
+EMBEDS_PER_MESSAGE = 10
+EMBED_CHARS_PER_MESSAGE = 6000
+
+# Most messages a single !quote may cover
+MAX_QUOTE_COUNT = 50
+
+def pack_quote_blocks(blocks, reserved=0):
+    """
+    Pack quoted message blocks into embed descriptions, grouped per Discord message.
+
+    Blocks are joined into as few descriptions as fit EMBED_DESCRIPTION_LIMIT, and
+    descriptions into as few messages as fit EMBEDS_PER_MESSAGE and
+    EMBED_CHARS_PER_MESSAGE minus `reserved` characters for the header.
+
+    Returns:
+        list[list[str]]: The embed descriptions of each message to send.
+    """
+    budget = EMBED_CHARS_PER_MESSAGE - reserved
+    limit = min(EMBED_DESCRIPTION_LIMIT, budget)
+    messages = []
+    descriptions = []
+    used = 0
+    current = ""
+
+    for block in blocks:
+        block = block[:limit]
+        joined = len(current) + 1 + len(block)
+        if current and joined <= limit and used + joined <= budget:
+            current += "\n" + block
+            continue
+
+        if current:
+            descriptions.append(current)
+            used += len(current)
+        if len(descriptions) == EMBEDS_PER_MESSAGE or used + len(block) > budget:
+            messages.append(descriptions)
+            descriptions = []
+            used = 0
+        current = block
+
+    if current:
+        descriptions.append(current)
+    if descriptions:
+        messages.append(descriptions)
+    return messages
+
 class QuoteCommands(commands.Cog):
     """Commands for quoting other messages"""
 
@@ -15,24 +65,40 @@ class QuoteCommands(commands.Cog):
         self.config = bot.config
 
     @commands.command(name="quote", aliases=["q", "rt"])
-    async def quote_msg(self, ctx):
-        """Quote a message with optional additional content"""
-        # Check if this is a reply to another message
+    @instrument("command")
+    async def quote_msg(self, ctx, count: str = None):
+        """Quote a message, or several messages leading up to it"""
+        if count is not None:
+            if not count.isdigit() or not 1 <= int(count) <= MAX_QUOTE_COUNT:
+                await ctx.send(f"ERROR: Quote count must be a number from 1 to {MAX_QUOTE_COUNT}")
+                return
+            count = int(count)
+
+        # Check if this is a reply to another message, which a count doesn't need
         if not ctx.message.reference:
-            await ctx.send("ERROR: You need to reply to a message to quote it")
-            return
+            if count is None:
+                await ctx.send("ERROR: You need to reply to a message to quote it")
+                return
+            reference_message = None
+        else:
+            # Get the message being replied to
+            reference_message = await self.resolve_reference(ctx)
+            if reference_message is None:
+                await ctx.send("ERROR: Could not find the message you're replying to")
+                return
 
-        # Get the message being replied to
-        try:
-            reference_message = await ctx.channel.fetch_message(ctx.message.reference.message_id)
-        except discord.NotFound:
-            await ctx.send("ERROR: Could not find the message you're replying to")
-            return
+        if count is None or (count == 1 and reference_message is not None):
+            await self.quote_single(ctx, reference_message)
+        else:
+            await self.quote_many(ctx, reference_message, count)
 
+    async def quote_single(self, ctx, reference_message):
+        """Quote one message in an embed that resembles a forwarded message"""
         # Get original message details
         original_content = reference_message.content
         original_author = reference_message.author.display_name
-        timestamp = format_date_for_quotes(reference_message.created_at, self.config.local_tz)
+        timezone = await self.bot.get_timezone(ctx.guild.id, ctx.author.id)
+        timestamp = format_date_for_quotes(reference_message.created_at, timezone)
         msg_url = reference_message.jump_url
 
         # Prep quoter
@@ -44,14 +110,119 @@ class QuoteCommands(commands.Cog):
         embed.set_footer(text=f"{original_author} • {timestamp}")
         embed.set_author(name=formatted_quoter, url=msg_url)
 
-        # Send the manually created "forwarded" message
-        await ctx.send(embed=embed)
+        # Send the manually created "forwarded" message and delete the command at the same time
+        async with io_timer("discord"):
+            await asyncio.gather(ctx.send(embed=embed), self.delete_command(ctx))
+
+    async def quote_many(self, ctx, reference_message, count):
+        """
+        Quote the `count` messages ending at the replied-to message, or before the command
+        if there is no reply, packed into as few embeds and sends as Discord allows.
+        """
+        if reference_message is not None:
+            before, limit = reference_message, count - 1
+        else:
+            before, limit = ctx.message, count
+
+        # One history call for the whole range
+        async with io_timer("discord"):
+            history = [message async for message in ctx.channel.history(limit=limit, before=before)]
+        for message in history:
+            self.bot.recent_messages.add(message)
+
+        messages = history[::-1]
+        if reference_message is not None:
+            messages.append(reference_message)
+        if not messages:
+            await ctx.send("ERROR: There are no messages to quote")
+            return
+
+        timezone = await self.bot.get_timezone(ctx.guild.id, ctx.author.id)
+        timestamps = format_dates_for_quotes([message.created_at for message in messages], timezone)
+        blocks = [
+            f"**{message.author.display_name}** • {timestamp}\n{message.content}"
+            for message, timestamp in zip(messages, timestamps)
+        ]
 
-        # Delete the original command message
+        header = f"{ctx.message.author.display_name} quoted {len(messages)} messages:"
+        msg_url = messages[0].jump_url
+
+        sends = []
+        for descriptions in pack_quote_blocks(blocks, len(header)):
+            embeds = [discord.Embed(description=description) for description in descriptions]
+            embeds[0].set_author(name=header, url=msg_url)
+            sends.append(embeds)
+
+        # Sends go out in order, while the command is deleted alongside them
+        async def send_all():
+            for embeds in sends:
+                await ctx.send(embeds=embeds)
+
+        async with io_timer("discord"):
+            await asyncio.gather(send_all(), self.delete_command(ctx))
+
+    async def resolve_reference(self, ctx):
+        """
+        Get the message a command replies to, or None if it no longer exists.
+
+        The gateway usually includes the referenced message with the reply, and
+        recently seen messages are cached per channel, so the API is only asked
+        as a last resort.
+        """
+        reference = ctx.message.reference
+        resolutions = self.bot.metrics.counter(
+            "quote_resolutions_total", "Quoted messages resolved by source", ("source",)
+        )
+
+        if isinstance(reference.resolved, discord.Message):
+            resolutions.inc("reference")
+            return reference.resolved
+        if isinstance(reference.resolved, discord.DeletedReferencedMessage):
+            return None
+
+        message = self.bot.recent_messages.get(reference.channel_id, reference.message_id)
+        if message is not None:
+            resolutions.inc("cache")
+            return message
+
+        resolutions.inc("api")
+        try:
+            async with io_timer("discord"):
+                message = await ctx.channel.fetch_message(reference.message_id)
+        except discord.NotFound:
+            return None
+        self.bot.recent_messages.add(message)
+        return message
+
+    async def delete_command(self, ctx):
+        """Delete the message that invoked a command"""
         try:
             await ctx.message.delete()
         except discord.Forbidden:
             await ctx.send("ERROR: I don't have permission to delete messages")
+        except discord.NotFound:
+            # Already deleted, e.g. by its author or a moderator
+            pass
+
+    @commands.command(name="timezone", aliases=["tz"])
+    async def set_timezone(self, ctx, timezone: str = None):
+        """Show or set the timezone used for your quote timestamps"""
+        if not timezone:
+            current = await self.bot.get_timezone(ctx.guild.id, ctx.author.id)
+            await ctx.send(
+                f"Your quote timestamps use {current}. "
+                f"Use {self.config.cmd_prefix}timezone <timezone|reset> to change it"
+            )
+            return
+
+        if timezone != "reset" and not is_valid_timezone(timezone):
+            await ctx.send(f"ERROR: Unknown timezone '{timezone}'. Use a name like America/New_York")
+            return
+
+        # Only this user's entry is written, so users setting their timezones at once don't undo each other
+        await self.bot.set_user_timezone(ctx.guild.id, ctx.author.id, None if timezone == "reset" else timezone)
+        current = await self.bot.get_timezone(ctx.guild.id, ctx.author.id)
+        await ctx.send(f"SUCCESS: Your quote timestamps now use {current}")
 
 async def setup(bot):
     """Add the quote commands to the bot"""
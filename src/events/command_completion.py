@@ -0,0 +1,25 @@
+"""Command completion event handlers for the Discord Pasta Bot"""
+import logging
+
+logger = logging.getLogger("bot.events.command_completion")
+
+class CommandCompletionEvents:
+    """On-command completion event handlers"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.commands_total = bot.metrics.counter(
+            "commands_total", "Built-in commands completed successfully", ("command",)
+        )
+
+        # Register event handlers
+        self.bot.event(self.on_command_completion)
+
+    async def on_command_completion(self, ctx):
+        """Count completed built-in commands"""
+        self.commands_total.inc(ctx.command.qualified_name)
+
+def setup(bot):
+    """Set up command completion event handlers"""
+    CommandCompletionEvents(bot)
+    logger.info("Command completion events handlers loaded")
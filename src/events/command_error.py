@@ -2,6 +2,8 @@
 import logging
 from discord.ext import commands
 
+from src.utils.instrumentation import instrument
+
 logger = logging.getLogger("bot.events.command_error")
 
 class CommandErrorEvents:
@@ -15,19 +17,13 @@ class CommandErrorEvents:
         # Register event handlers
         self.bot.event(self.on_command_error)
 
+    @instrument("event")
     async def on_command_error(self, ctx, error):
         if isinstance(error, commands.CommandNotFound):
-            command = ctx.message.content[len(self.config.cmd_prefix):]
-            pasta_document = self.db.get_command(ctx.guild.id, command)
-
-            if pasta_document is not None:
-                await ctx.send(pasta_document['content'])
-            else:
-                await ctx.send(
-                    f"ERROR: Message starts with '{self.config.cmd_prefix}' but I don't recognize "
-                    f"this command. Use {self.config.cmd_prefix}help or "
-                    f"{self.config.cmd_prefix}commands to see what's available."
-                )
+            # Only reached when the fast pasta path in on_message is disabled
+            await self.bot.serve_pasta(ctx.message, ctx.invoked_with, ctx.view.read_rest())
+        elif isinstance(error, commands.NotOwner):
+            await ctx.send("ERROR: Only the bot owner can use this command.")
         elif isinstance(error, commands.MissingPermissions):
             await ctx.send(f"ERROR: User {ctx.author.display_name} has insufficient permissions to use command.")
         else:
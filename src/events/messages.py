@@ -1,8 +1,13 @@
 """Message event handlers and easter eggs"""
 import logging
-import asyncio
+import os
 import discord
 
+from src.utils.cooldowns import cooldown_key
+from src.utils.instrumentation import instrument
+from src.utils.log_pipeline import MessageLogger
+from src.utils.triggers import TriggerMatcher, load_trigger_registry
+
 logger = logging.getLogger("bot.events.messages")
 
 class MessageEvents:
@@ -12,73 +17,130 @@ class MessageEvents:
         self.bot = bot
         self.cooldowns = bot.cooldowns
         self.config = bot.config
+
+        self.scripts = bot.scripts
+
+        # Compile the trigger registry once at startup
+        registry = load_trigger_registry(os.path.join(self.config.assets_dir, "triggers.json"))
+        self.triggers = TriggerMatcher.from_registry(registry, self.scripts)
         
+        # Sampled logging of incoming messages
+        self.message_logger = MessageLogger(self.config, logger)
+
+        # Scripts currently being posted, keyed by user ID
+        self.script_jobs = {}
+
         # Register event handlers
         self.bot.event(self.on_message)
+        self.bot.event(self.on_raw_message_edit)
+        self.bot.event(self.on_raw_message_delete)
     
+    @instrument("event")
     async def on_message(self, message):
         """Process messages for easter eggs and command handling"""
+        # Remember guild messages, including other bots', so they can be quoted cheaply
+        if message.guild is not None:
+            self.bot.recent_messages.add(message)
+
         # Ignore messages from bots and DMs
         if message.author.bot or message.guild is None:
             if message.author != self.bot.user and message.guild is None:
-                await message.channel.send("ERROR: I don't currently have support for any commands in private messages. Sorry!")
+                await self.on_private_message(message)
             return
 
         # Log messages
-        logger.info(f"{message.guild.name} | {message.channel.name} | {message.author.name}: {message.content}")
+        self.message_logger.log(message)
 
         # Easter eggs
-        infinity_triggers = [
-            "In time you will know what it's like to lose.",
-            "In Time",
-            "Destiny still arrives.",
-            "Fun isn't something one considers from balancing the universe.",
-            "In",
-            "Fun"
-        ]
-
-        if any(message.content.startswith(trigger) for trigger in infinity_triggers):
-            if not self.cooldowns.get("avengers-iw", False):
-                await self.post_txt("avengers-iw", message.author)
-            else:
-                await message.channel.send(
-                    "Anti-Avengers Initiative is on cooldown. I'm probably still posting it to someone right now. "
-                    "Enjoy your freedom while you can!"
-                )
+        script = self.triggers.match(message.content)
+        if script is not None and await self.is_script_enabled(message.guild.id, script):
+            await self.trigger_script(message, script)
+
+        # Serve custom commands directly, leaving built-ins to process_commands
+        command, args = self.parse_command(message.content)
+        if command and self.config.fast_pasta_path and command not in self.bot.all_commands:
+            await self.bot.serve_pasta(message, command, args)
+            return
 
         # Process commands
         await self.bot.process_commands(message)
+
+    async def on_raw_message_edit(self, payload):
+        """Forget edited messages so quotes show their new content"""
+        self.bot.recent_messages.remove(payload.channel_id, payload.message_id)
+
+    async def on_raw_message_delete(self, payload):
+        """Forget deleted messages so they can't be quoted from the cache"""
+        self.bot.recent_messages.remove(payload.channel_id, payload.message_id)
+
+    async def trigger_script(self, message, script):
+        """Post an easter egg script to the author unless the trigger or the author is on cooldown"""
+        user_key = cooldown_key("script_user", message.author.id)
+        if self.cooldowns.remaining(user_key):
+            return
+
+        script_key = cooldown_key("script", message.guild.id, script)
+        if self.cooldowns.hit(script_key, per=self.config.script_cooldown, persist=True):
+            await message.channel.send(
+                "Anti-Avengers Initiative is on cooldown. I'm probably still posting it to someone right now. "
+                "Enjoy your freedom while you can!"
+            )
+            return
+
+        self.cooldowns.hit(user_key, per=self.config.script_user_cooldown, persist=True)
+        await self.bot.save_cooldowns()
+        await self.post_txt(script, message.author)
+
+    async def is_script_enabled(self, guild_id, script):
+        """Check whether a guild has turned an easter egg script off"""
+        settings = await self.bot.get_guild_settings(guild_id)
+        return script not in settings.get('disabled_scripts', ())
+
+    async def on_private_message(self, message):
+        """Let users stop and resume a script being posted to them"""
+        job = self.script_jobs.get(message.author.id)
+        reply = message.content.strip().lower()
+
+        if job is not None and not job.finished:
+            if reply == "stop" and not job.cancelled:
+                job.cancel()
+                await message.channel.send("Stopped. Reply \"resume\" if you change your mind.")
+                return
+            if reply == "resume" and job.cancelled:
+                self.bot.sender.resume(job)
+                return
+
+        await message.channel.send("ERROR: I don't currently have support for any commands in private messages. Sorry!")
+
+    def parse_command(self, content):
+        """Split a prefixed message into the command name and the rest, or (None, "") if it isn't one"""
+        prefix = self.config.cmd_prefix
+        if not content.startswith(prefix):
+            return None, ""
+
+        tokens = content[len(prefix):].split(maxsplit=1)
+        if not tokens:
+            return None, ""
+        return tokens[0], tokens[1] if len(tokens) > 1 else ""
     
     async def post_txt(self, textfilename, user):
-        """Post the contents of a text file to the channel"""
-        # Set cooldown
-        self.cooldowns[textfilename] = True
-
-        file = f"assets/{textfilename}.txt"
-        message = ""
-
-        try:
-            with open(file, "rb") as f:
-                for l in f:
-                    line = l.decode(errors='ignore')
-                    # Respect Discord's message length limit
-                    if len(message + line) > self.config.max_message_len:
-                        await user.send(message)
-                        message = ""
-                    if line.strip():
-                        message += line
-
-            if message:
-                await user.send(message)
-
-        except FileNotFoundError:
-            logger.error(f"Text file not found: {file}")
-        except Exception as e:
-            logger.error(f"Error posting text file: {e}")
-
-        # Reset cooldown after 5 minutes
-        await asyncio.sleep(300)
-        self.cooldowns[textfilename] = False
+        """Post the contents of a text file to the user"""
+        chunks = self.scripts.get(textfilename)
+
+        if chunks is None:
+            logger.error(f"Text asset not found: {textfilename}")
+        else:
+            # Queue the whole script; the user can stop or resume it from their DMs
+            job = self.bot.sender.submit(user, chunks)
+            job.result.add_done_callback(lambda result: self.on_script_done(user, result))
+            self.script_jobs[user.id] = job
+
+    def on_script_done(self, user, result):
+        """Clean up after a script has been fully posted or failed"""
+        if self.script_jobs.get(user.id) is not None and self.script_jobs[user.id].result is result:
+            del self.script_jobs[user.id]
+        if result.exception() is not None:
+            logger.error(f"Error posting text file: {result.exception()}")
 
 def setup(bot):
     """Set up message event handlers"""
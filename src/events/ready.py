@@ -2,6 +2,8 @@
 import logging
 import discord
 
+from src.utils.lifecycle import ALL_SHARDS
+
 logger = logging.getLogger("bot.events.ready")
 
 class ReadyEvents:
@@ -14,10 +16,16 @@ class ReadyEvents:
         # Register event handlers
         self.bot.event(self.on_ready)
         self.bot.event(self.on_guild_join)
+        self.bot.event(self.on_guild_available)
+        self.bot.event(self.on_guild_remove)
+        self.bot.event(self.on_shard_ready)
+        self.bot.event(self.on_shard_disconnect)
+        self.bot.event(self.on_shard_resumed)
 
     async def on_ready(self):
         """Called when the bot is ready and connected to Discord"""
         logger.info(f"Logged in as: {self.bot.user} (ID: {self.bot.user.id})")
+        self.bot.connections.reconnected(ALL_SHARDS, "restart")
 
         # Set initial activity
         if self.config.game:
@@ -32,6 +40,39 @@ class ReadyEvents:
 
         logger.info("Bot is ready!")
 
+    async def on_guild_available(self, guild):
+        """Called when a guild becomes available, e.g. on startup or after a shard re-identifies"""
+        if not self.config.pasta_cache_warm:
+            return
+        # The name index is kept up to date by every write, so a guild that is already warm stays warm
+        if self.bot.pasta_cache.get_names(guild.id) is not None:
+            return
+
+        try:
+            await self.bot.warm_pasta_cache(guild.id)
+        except Exception as e:
+            logger.error(f"Error warming pasta cache for {guild.name}: {e}")
+
+    async def on_guild_remove(self, guild):
+        """Called when the bot leaves a guild"""
+        logger.info(f"Left guild: {guild.name} (ID: {guild.id})")
+        self.bot.pasta_cache.drop_guild(guild.id)
+
+    async def on_shard_ready(self, shard_id):
+        """Called when a single shard has connected and loaded its guilds"""
+        guilds = sum(1 for guild in self.bot.guilds if guild.shard_id == shard_id)
+        logger.info(f"Shard {shard_id} ready with {guilds} guilds")
+        self.bot.connections.reconnected(shard_id, "identify")
+
+    async def on_shard_disconnect(self, shard_id):
+        """Called when a shard loses its gateway connection; discord.py reconnects it"""
+        logger.warning(f"Shard {shard_id} disconnected")
+        self.bot.connections.disconnected(shard_id)
+
+    async def on_shard_resumed(self, shard_id):
+        """Called when a shard has resumed its previous session"""
+        self.bot.connections.reconnected(shard_id, "resume")
+
     async def on_guild_join(self, guild):
         """Called when the bot joins a new guild (server)"""
         logger.info(f"Joined new guild: {guild.name} (ID: {guild.id})")
@@ -0,0 +1,74 @@
+"""Text asset loading for easter egg scripts"""
+import logging
+from pathlib import Path
+
+logger = logging.getLogger("bot.assets")
+
+def chunk_text(data: bytes, max_len: int) -> tuple:
+    """
+    Split raw text into message-sized chunks.
+
+    Blank lines are dropped and lines are packed greedily so that no chunk
+    exceeds max_len. Lines longer than max_len are split across chunks.
+
+    :param data: The raw file contents.
+    :param max_len: The maximum length of a single chunk.
+    :return: An immutable tuple of chunks, in order.
+    """
+    chunks = []
+    pending = []
+    pending_len = 0
+
+    for line in data.decode(errors='ignore').splitlines(keepends=True):
+        if not line.strip():
+            continue
+
+        # Split lines that could never fit in a message on their own
+        pieces = [line[i:i + max_len] for i in range(0, len(line), max_len)]
+        for piece in pieces:
+            if pending_len + len(piece) > max_len:
+                chunks.append("".join(pending))
+                pending = []
+                pending_len = 0
+            pending.append(piece)
+            pending_len += len(piece)
+
+    if pending:
+        chunks.append("".join(pending))
+
+    return tuple(chunks)
+
+class AssetLibrary:
+    """Text assets loaded once and pre-chunked for sending"""
+
+    def __init__(self, directory, max_message_len):
+        """
+        Load every .txt file in a directory.
+
+        Args:
+            directory (str): Directory containing the text assets.
+            max_message_len (int): Maximum length of a single message.
+        """
+        self.directory = Path(directory)
+        self.max_message_len = max_message_len
+        self.scripts = {}
+        self.load()
+
+    def load(self):
+        """(Re)load all assets from disk"""
+        scripts = {}
+        for path in sorted(self.directory.glob("*.txt")):
+            try:
+                scripts[path.stem] = chunk_text(path.read_bytes(), self.max_message_len)
+            except OSError as e:
+                logger.error(f"Could not load asset {path}: {e}")
+
+        self.scripts = scripts
+        logger.info(f"Loaded {len(scripts)} text assets: {', '.join(scripts)}")
+
+    def get(self, name):
+        """Get the chunks of an asset, or None if it doesn't exist"""
+        return self.scripts.get(name)
+
+    def __iter__(self):
+        return iter(self.scripts)
@@ -0,0 +1,157 @@
+"""In-process cache for custom command content"""
+import logging
+import sys
+import time
+from collections import OrderedDict
+
+from src.utils.fuzzy import BKTree
+
+logger = logging.getLogger("bot.cache")
+
+# Returned by PastaCache.get when the cache can't answer and the database must be asked
+MISSING = object()
+
+class PastaCache:
+    """LRU/TTL cache of pasta content keyed by (guild_id, command), bounded by total bytes"""
+
+    def __init__(self, max_bytes=8 * 1024 * 1024, ttl=3600):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_bytes (int): Upper bound on the memory used by cached command names and content.
+            ttl (float): Seconds an entry stays valid. 0 disables expiry.
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        # (guild_id, command) -> (content or None, size, expires_at)
+        self._entries = OrderedDict()
+        # guild_id -> (complete set of command names, BK-tree of those names). Unlike content these
+        # don't expire: every add and remove writes through, so they stay accurate until drop_guild
+        self._names = {}
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expiry(self):
+        return time.monotonic() + self.ttl if self.ttl else None
+
+    @staticmethod
+    def _expired(expires_at):
+        return expires_at is not None and expires_at <= time.monotonic()
+
+    def get(self, guild_id, command):
+        """
+        Look up a command's content.
+
+        Returns:
+            The content string, None if the command is known not to exist,
+            or MISSING if the database has to be consulted.
+        """
+        key = (guild_id, command)
+        entry = self._entries.get(key)
+        if entry is not None:
+            content, _, expires_at = entry
+            if not self._expired(expires_at):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return content
+            self._drop(key)
+
+        # A warmed guild knows its full command set, so anything outside it is a miss
+        names = self.get_names(guild_id)
+        if names is not None and command not in names:
+            self.hits += 1
+            return None
+
+        self.misses += 1
+        return MISSING
+
+    def get_names(self, guild_id):
+        """Get the complete set of command names for a warmed guild, or None"""
+        entry = self._names.get(guild_id)
+        return entry[0] if entry is not None else None
+
+    def suggest(self, guild_id, command, max_distance=2, k=3):
+        """
+        Get the command names of a warmed guild closest to a mistyped command.
+
+        Returns an empty list if the guild isn't warmed, so a miss never costs a query.
+        """
+        if self.get_names(guild_id) is None:
+            return []
+        index = self._names[guild_id][1]
+        return index.search(command, max_distance=max_distance, k=k)
+
+    def put(self, guild_id, command, content):
+        """Store a command's content, or None to remember that it doesn't exist"""
+        key = (guild_id, command)
+        if key in self._entries:
+            self._drop(key)
+
+        # The name index stays complete even when the content itself is too large to keep
+        names = self.get_names(guild_id)
+        if names is not None:
+            index = self._names[guild_id][1]
+            if content is None:
+                names.discard(command)
+                index.remove(command)
+            else:
+                names.add(command)
+                index.add(command)
+
+        # Every entry is charged for its command name, so negative entries count towards the bound too
+        size = sys.getsizeof(command)
+        if content is not None:
+            size += sys.getsizeof(content)
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (content, size, self._expiry())
+        self._bytes += size
+
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def invalidate(self, guild_id, command):
+        """Forget a command, e.g. after it has been removed"""
+        self._drop((guild_id, command))
+        names = self.get_names(guild_id)
+        if names is not None:
+            names.discard(command)
+            self._names[guild_id][1].remove(command)
+
+    def load_guild(self, guild_id, documents):
+        """Warm the cache with every command document of a guild"""
+        self._names[guild_id] = (set(), BKTree())
+        for document in documents:
+            self.put(guild_id, document['_id'], document['content'])
+
+    def drop_guild(self, guild_id):
+        """Forget everything about a guild, e.g. after leaving it or its shard moving away"""
+        self._names.pop(guild_id, None)
+        for key in [key for key in self._entries if key[0] == guild_id]:
+            self._drop(key)
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def stats(self):
+        """Get hit/miss statistics for the cache"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'guilds_warmed': len(self._names),
+        }
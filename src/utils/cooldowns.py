@@ -0,0 +1,100 @@
+"""Timestamp-based cooldowns and rate limits for commands and easter eggs"""
+import heapq
+import time
+
+def cooldown_key(scope, *parts):
+    """Build a bucket key such as 'script:<guild_id>:<script>' that every storage backend can hold"""
+    return ":".join((scope, *map(str, parts)))
+
+class CooldownStore:
+    """
+    Rate limit buckets keyed by strings, e.g. per guild, per user or per trigger.
+
+    Each bucket is a single timestamp (the generic cell rate algorithm), so
+    nothing sleeps or runs in the background while a cooldown is active. A
+    plain cooldown is the special case of a rate of 1 per `cooldown` seconds.
+    Expired buckets are dropped in expiry order through a heap as new hits
+    come in.
+
+    Timestamps are wall clock (time.time()) so persisted buckets survive a restart.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+
+        # key -> theoretical arrival time: the bucket is empty again at this timestamp
+        self._buckets = {}
+        # (expires_at, key), possibly with stale entries for buckets hit again since
+        self._expiry = []
+
+        # Persisted buckets changed since the last call to take_dirty
+        self._dirty = {}
+
+    def hit(self, key, rate=1, per=0.0, persist=False):
+        """
+        Count an action against a bucket allowing `rate` actions every `per` seconds.
+
+        Returns:
+            float: 0.0 if the action is allowed (and counted), otherwise the
+            seconds until it would be.
+        """
+        if rate <= 0 or per <= 0:
+            return 0.0
+
+        now = self.clock()
+        self.purge(now)
+
+        interval = per / rate
+        arrival, retry_after = self._arrival(key, interval, per, now)
+        if retry_after > 0:
+            return retry_after
+
+        self._buckets[key] = arrival + interval
+        heapq.heappush(self._expiry, (arrival + interval, key))
+        if persist:
+            self._dirty[key] = arrival + interval
+        return 0.0
+
+    def check(self, key, rate=1, per=0.0):
+        """Get the seconds until hit() would allow an action, like hit() but without counting one"""
+        if rate <= 0 or per <= 0:
+            return 0.0
+        return max(self._arrival(key, per / rate, per, self.clock())[1], 0.0)
+
+    def _arrival(self, key, interval, per, now):
+        """Get a bucket's theoretical arrival time and the seconds until it admits another action"""
+        arrival = max(self._buckets.get(key, now), now)
+        return arrival, arrival - (per - interval) - now
+
+    def remaining(self, key):
+        """Get the seconds until a bucket is empty again"""
+        return max(self._buckets.get(key, 0.0) - self.clock(), 0.0)
+
+    def purge(self, now=None):
+        """Drop every expired bucket"""
+        now = self.clock() if now is None else now
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry)
+            if self._buckets.get(key) == expires_at:
+                del self._buckets[key]
+
+    def load(self, buckets):
+        """Restore persisted buckets from a {key: expires_at} mapping"""
+        now = self.clock()
+        for key, expires_at in buckets.items():
+            if expires_at > now and expires_at > self._buckets.get(key, 0.0):
+                self._buckets[key] = expires_at
+                heapq.heappush(self._expiry, (expires_at, key))
+
+    def take_dirty(self):
+        """Get and clear the persisted buckets changed since the last call"""
+        dirty, self._dirty = self._dirty, {}
+        return dirty
+
+    def restore_dirty(self, dirty):
+        """Mark buckets from take_dirty as changed again, e.g. after saving them failed"""
+        for key, expires_at in dirty.items():
+            self._dirty[key] = max(expires_at, self._dirty.get(key, 0.0))
+
+    def __len__(self):
+        return len(self._buckets)
@@ -1,54 +1,382 @@
-"""Database utility for MongoDB operations"""
+"""Database utility for MongoDB operations and the storage interface shared by all backends"""
 import logging
-from pymongo import MongoClient
+from datetime import datetime, timezone
+
+from src.utils.instrumentation import io_timer, track_io
 
 logger = logging.getLogger("bot.database")
 
-class Database:
-    """MongoDB database wrapper for the bot"""
+# Collection holding every guild's commands in the single-collection schema
+PASTAS_COLLECTION = 'pastas'
+
+# Collection holding persisted cooldowns, expired by a TTL index
+COOLDOWNS_COLLECTION = 'cooldowns'
+
+# Collection holding hourly command usage rollups, expired by a TTL index
+USAGE_COLLECTION = 'usage'
+
+# per_guild: one collection per guild (legacy)
+# single: one 'pastas' collection with a unique (guild_id, name) index
+# migrating: read from per-guild collections, write to both, while src.utils.migrate runs
+SCHEMAS = ('per_guild', 'single', 'migrating')
+
+class BaseDatabase:
+    """
+    Storage interface the bot relies on.
+
+    Commands are returned as {'_id': name, 'content': content} documents and
+    every method is a coroutine (or an async iterator for the iter_* methods).
+    """
+
+    async def connect(self):
+        """Open connections ahead of the first query"""
+
+    async def ensure_indexes(self):
+        """Create whatever indexes or tables the backend relies on"""
+
+    async def add_command(self, guild_id, command, content):
+        """Add or update a custom command, returning True if it's new"""
+        raise NotImplementedError
+
+    async def add_commands(self, guild_id, commands, batch_size=1000):
+        """Add or update a dict of custom commands, returning how many were written"""
+        raise NotImplementedError
+
+    async def remove_command(self, guild_id, command):
+        """Remove a custom command, returning True if it existed"""
+        raise NotImplementedError
+
+    async def get_command(self, guild_id, command):
+        """Get a command's document, or None"""
+        raise NotImplementedError
+
+    async def get_all_commands(self, guild_id):
+        """Get a list of all command documents of a guild, ordered by name"""
+        raise NotImplementedError
+
+    def iter_commands(self, guild_id):
+        """Stream the command documents of a guild, ordered by name"""
+        raise NotImplementedError
+
+    def iter_command_names(self, guild_id):
+        """Stream the command names of a guild in order"""
+        raise NotImplementedError
+
+    async def get_guild_settings(self, guild_id):
+        """Get a guild's settings as a dict"""
+        raise NotImplementedError
+
+    async def update_guild_settings(self, guild_id, settings):
+        """Set fields of a guild's settings"""
+        raise NotImplementedError
+
+    async def set_user_timezone(self, guild_id, user_id, timezone):
+        """Set one user's timezone in a guild's settings, or remove it if timezone is None"""
+        raise NotImplementedError
+
+    async def get_cooldowns(self):
+        """Get persisted cooldowns that haven't expired as a {key: expires_at} dict of POSIX timestamps"""
+        raise NotImplementedError
+
+    async def save_cooldowns(self, cooldowns):
+        """Persist a {key: expires_at} dict of cooldowns, replacing existing ones"""
+        raise NotImplementedError
+
+    async def save_usage(self, usage):
+        """Add a {(guild_id, command, hour): uses} dict of counts to the hourly usage rollups"""
+        raise NotImplementedError
+
+    async def get_top_commands(self, guild_id, since, limit=10):
+        """Get a guild's most used commands since a POSIX timestamp as (name, uses) pairs, most used first"""
+        raise NotImplementedError
+
+    async def get_usage(self, guild_id, since, command=None):
+        """Get a guild's uses per hour since a POSIX timestamp as an {hour: uses} dict, optionally of one command"""
+        raise NotImplementedError
+
+    async def ping(self):
+        """Check that the storage is reachable"""
+        raise NotImplementedError
 
-    def __init__(self, uri):
+    async def close(self):
+        """Release connections and other resources"""
+
+def create_database(config):
+    """Create the storage backend selected by DATABASE_URI"""
+    if config.db_uri.startswith("sqlite:"):
+        from src.utils.sqlite_db import SQLiteDatabase
+        return SQLiteDatabase(config.db_uri, usage_retention_days=config.usage_retention_days)
+
+    return Database(
+        config.db_uri,
+        pool_size=config.db_pool_size,
+        timeout_ms=config.db_timeout_ms,
+        schema=config.db_schema,
+        usage_retention_days=config.usage_retention_days
+    )
+
+class Database(BaseDatabase):
+    """Async MongoDB database wrapper for the bot"""
+
+    def __init__(self, uri, pool_size=100, timeout_ms=5000, schema='per_guild', usage_retention_days=90):
         """Initialize database connection"""
+        if schema not in SCHEMAS:
+            raise ValueError(f"Unknown database schema '{schema}', expected one of {', '.join(SCHEMAS)}")
+
+        self.uri = uri
+        self.pool_size = pool_size
+        self.timeout_ms = timeout_ms
         self.client = None
-        self.db = None
+        self._db = None
+        self.schema = schema
+        # In the migrating schema the per-guild collections stay the source of truth
+        self.uses_legacy = schema != 'single'
+        self.uses_single = schema != 'per_guild'
+        self.usage_retention = usage_retention_days * 86400
+
+    @property
+    def db(self):
+        """The 'Morton' database, creating the client on first use"""
+        if self._db is None:
+            self._create_client()
+        return self._db
 
+    @property
+    def pastas(self):
+        """The collection of the single-collection schema"""
+        return self.db[PASTAS_COLLECTION]
+
+    def _create_client(self):
+        # pymongo is only imported once a MongoDB backend is actually used
+        from pymongo import AsyncMongoClient
         try:
             logger.info("Connecting to database")
-            self.client = MongoClient(uri)
-            self.db = self.client['Morton']
-            logger.info("Database connection established")
+            # The async client never blocks the event loop; sockets are opened lazily
+            # from a bounded pool and every operation is capped by timeoutMS.
+            self.client = AsyncMongoClient(
+                self.uri,
+                maxPoolSize=self.pool_size,
+                timeoutMS=self.timeout_ms,
+                serverSelectionTimeoutMS=self.timeout_ms,
+                connectTimeoutMS=self.timeout_ms,
+            )
+            self._db = self.client['Morton']
         except Exception as e:
             logger.error(f"Failed to connect to database: {e}")
             raise
 
+    async def connect(self):
+        """Create the client and open a pooled connection so the first lookup doesn't pay for it"""
+        await self.ping()
+        logger.info("Database connection established")
+
     def get_collection(self, guild_id):
         """Get collection for a specific guild"""
         return self.db[str(guild_id)]
 
-    def add_command(self, guild_id, command, content):
+    @track_io("db")
+    async def ensure_indexes(self):
+        """Create the indexes the configured schema relies on"""
+        if self.uses_single:
+            await self.pastas.create_index([('guild_id', 1), ('name', 1)], unique=True, name='guild_id_name')
+        await self.db[COOLDOWNS_COLLECTION].create_index('expires_at', expireAfterSeconds=0, name='expires_at_ttl')
+        await self.db[USAGE_COLLECTION].create_index(
+            [('guild_id', 1), ('name', 1), ('hour', 1)], unique=True, name='guild_id_name_hour'
+        )
+        await self.db[USAGE_COLLECTION].create_index('expires_at', expireAfterSeconds=0, name='expires_at_ttl')
+
+    @track_io("db")
+    async def add_command(self, guild_id, command, content):
         """Add or update a custom command"""
-        collection = self.get_collection(guild_id)
-        document = {'_id': command, 'content': content}
-        result = collection.update_one({'_id': command}, {'$set': document}, upsert=True)
-        return result.upserted_id is not None
+        is_new = None
+        # The per-guild collection is written first, so a command the migration finds in pastas
+        # is always in the legacy collection too and isn't mistaken for a removed one
+        if self.uses_legacy:
+            # Until the migration is done, the per-guild collection decides what is new
+            collection = self.get_collection(guild_id)
+            document = {'_id': command, 'content': content}
+            result = await collection.update_one({'_id': command}, {'$set': document}, upsert=True)
+            is_new = result.upserted_id is not None
+        if self.uses_single:
+            result = await self.pastas.update_one(
+                {'guild_id': guild_id, 'name': command}, {'$set': {'content': content}}, upsert=True
+            )
+            if is_new is None:
+                is_new = result.upserted_id is not None
+        return is_new
 
-    def remove_command(self, guild_id, command):
+    @track_io("db")
+    async def add_commands(self, guild_id, commands, batch_size=1000):
+        """Add or update many custom commands with batched bulk writes"""
+        from pymongo import UpdateOne
+        items = list(commands.items())
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            # Legacy first, as in add_command
+            if self.uses_legacy:
+                await self.get_collection(guild_id).bulk_write([
+                    UpdateOne({'_id': command}, {'$set': {'content': content}}, upsert=True)
+                    for command, content in batch
+                ], ordered=False)
+            if self.uses_single:
+                await self.pastas.bulk_write([
+                    UpdateOne({'guild_id': guild_id, 'name': command}, {'$set': {'content': content}}, upsert=True)
+                    for command, content in batch
+                ], ordered=False)
+        return len(items)
+
+    @track_io("db")
+    async def remove_command(self, guild_id, command):
         """Remove a custom command"""
-        collection = self.get_collection(guild_id)
-        result = collection.delete_one({'_id': command})
-        return result.deleted_count > 0
+        success = False
+        if self.uses_single:
+            result = await self.pastas.delete_one({'guild_id': guild_id, 'name': command})
+            success = result.deleted_count > 0
+        if self.uses_legacy:
+            collection = self.get_collection(guild_id)
+            result = await collection.delete_one({'_id': command})
+            success = result.deleted_count > 0
+        return success
 
-    def get_command(self, guild_id, command):
+    @track_io("db")
+    async def get_command(self, guild_id, command):
         """Get a command's content"""
-        collection = self.get_collection(guild_id)
-        return collection.find_one({'_id': command})
+        if self.uses_legacy:
+            collection = self.get_collection(guild_id)
+            return await collection.find_one({'_id': command})
+
+        document = await self.pastas.find_one({'guild_id': guild_id, 'name': command}, {'name': 1, 'content': 1})
+        return {'_id': document['name'], 'content': document['content']} if document else None
 
-    def get_all_commands(self, guild_id):
+    @track_io("db")
+    async def get_all_commands(self, guild_id):
         """Get all custom commands for a guild"""
-        collection = self.get_collection(guild_id)
-        return collection.find().sort('_id', 1)
+        if self.uses_legacy:
+            collection = self.get_collection(guild_id)
+            return await collection.find().sort('_id', 1).to_list(None)
+
+        cursor = self.pastas.find({'guild_id': guild_id}, {'name': 1, 'content': 1}).sort('name', 1)
+        return [{'_id': document['name'], 'content': document['content']} async for document in cursor]
+
+    async def iter_commands(self, guild_id):
+        """Stream a guild's custom commands in order"""
+        async with io_timer("db"):
+            if self.uses_legacy:
+                async for document in self.get_collection(guild_id).find().sort('_id', 1):
+                    yield document
+            else:
+                cursor = self.pastas.find({'guild_id': guild_id}, {'name': 1, 'content': 1}).sort('name', 1)
+                async for document in cursor:
+                    yield {'_id': document['name'], 'content': document['content']}
+
+    async def iter_command_names(self, guild_id):
+        """Stream the names of a guild's custom commands in order, without their content"""
+        async with io_timer("db"):
+            if self.uses_legacy:
+                collection = self.get_collection(guild_id)
+                async for document in collection.find({}, {'_id': 1}).sort('_id', 1):
+                    yield document['_id']
+            else:
+                cursor = self.pastas.find({'guild_id': guild_id}, {'_id': 0, 'name': 1}).sort('name', 1)
+                async for document in cursor:
+                    yield document['name']
+
+    @track_io("db")
+    async def get_guild_settings(self, guild_id):
+        """Get the settings document of a guild"""
+        document = await self.db['settings'].find_one({'_id': guild_id})
+        return document or {}
+
+    @track_io("db")
+    async def update_guild_settings(self, guild_id, settings):
+        """Set fields of a guild's settings document"""
+        await self.db['settings'].update_one({'_id': guild_id}, {'$set': settings}, upsert=True)
+
+    @track_io("db")
+    async def set_user_timezone(self, guild_id, user_id, timezone):
+        """Set or unset one user's field of the settings document, leaving other users' untouched"""
+        field = f'user_timezones.{user_id}'
+        if timezone is None:
+            await self.db['settings'].update_one({'_id': guild_id}, {'$unset': {field: ""}})
+        else:
+            await self.db['settings'].update_one({'_id': guild_id}, {'$set': {field: timezone}}, upsert=True)
+
+    @track_io("db")
+    async def get_cooldowns(self):
+        """Get persisted cooldowns that haven't expired"""
+        # The TTL monitor only runs once a minute, so filter out what it hasn't removed yet
+        cursor = self.db[COOLDOWNS_COLLECTION].find({'expires_at': {'$gt': datetime.now(timezone.utc)}})
+        return {
+            document['_id']: document['expires_at'].replace(tzinfo=timezone.utc).timestamp()
+            async for document in cursor
+        }
+
+    @track_io("db")
+    async def save_cooldowns(self, cooldowns):
+        """Persist cooldowns with one bulk write"""
+        if not cooldowns:
+            return
+        from pymongo import UpdateOne
+        await self.db[COOLDOWNS_COLLECTION].bulk_write([
+            UpdateOne(
+                {'_id': key},
+                {'$set': {'expires_at': datetime.fromtimestamp(expires_at, timezone.utc)}},
+                upsert=True
+            )
+            for key, expires_at in cooldowns.items()
+        ], ordered=False)
+
+    @track_io("db")
+    async def save_usage(self, usage):
+        """Add usage counts to the hourly rollups with one bulk write"""
+        if not usage:
+            return
+        from pymongo import UpdateOne
+        await self.db[USAGE_COLLECTION].bulk_write([
+            UpdateOne(
+                {'guild_id': guild_id, 'name': command, 'hour': datetime.fromtimestamp(hour, timezone.utc)},
+                {
+                    '$inc': {'count': uses},
+                    '$set': {'expires_at': datetime.fromtimestamp(hour + self.usage_retention, timezone.utc)}
+                },
+                upsert=True
+            )
+            for (guild_id, command, hour), uses in usage.items()
+        ], ordered=False)
+
+    @track_io("db")
+    async def get_top_commands(self, guild_id, since, limit=10):
+        """Sum the hourly rollups of a guild per command"""
+        cursor = await self.db[USAGE_COLLECTION].aggregate([
+            {'$match': {'guild_id': guild_id, 'hour': {'$gte': datetime.fromtimestamp(since, timezone.utc)}}},
+            {'$group': {'_id': '$name', 'uses': {'$sum': '$count'}}},
+            {'$sort': {'uses': -1, '_id': 1}},
+            {'$limit': limit},
+        ])
+        return [(document['_id'], document['uses']) async for document in cursor]
+
+    @track_io("db")
+    async def get_usage(self, guild_id, since, command=None):
+        """Sum the hourly rollups of a guild, or of one of its commands, per hour"""
+        match = {'guild_id': guild_id, 'hour': {'$gte': datetime.fromtimestamp(since, timezone.utc)}}
+        if command is not None:
+            match['name'] = command
+        cursor = await self.db[USAGE_COLLECTION].aggregate([
+            {'$match': match},
+            {'$group': {'_id': '$hour', 'uses': {'$sum': '$count'}}},
+        ])
+        return {
+            int(document['_id'].replace(tzinfo=timezone.utc).timestamp()): document['uses']
+            async for document in cursor
+        }
+
+    @track_io("db")
+    async def ping(self):
+        """Check that the database is reachable"""
+        # Going through self.db creates the client if nothing has used it yet
+        await self.db.client.admin.command('ping')
 
-    def close(self):
+    async def close(self):
         """Close database connection"""
         if self.client:
-            self.client.close()
+            await self.client.close()
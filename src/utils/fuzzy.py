@@ -0,0 +1,114 @@
+"""Fuzzy command name lookup for "did you mean" suggestions"""
+
+def levenshtein(a, b, limit=None):
+    """
+    Get the edit distance between two strings.
+
+    :param limit: Stop early and return limit + 1 once the distance is known to exceed it.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+class BKTree:
+    """
+    Burkhard-Keller tree of names under case-insensitive edit distance.
+
+    Adding a name is O(depth). Removals only mark the name as deleted; the
+    tree is rebuilt once deleted names outnumber live ones.
+    """
+
+    def __init__(self, names=()):
+        self._root = None
+        self._deleted = set()
+        self.size = 0
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        """Add a name to the tree"""
+        if name in self._deleted:
+            self._deleted.discard(name)
+            self.size += 1
+            return
+
+        key = name.lower()
+        if self._root is None:
+            self._root = (name, key, {})
+            self.size += 1
+            return
+
+        node = self._root
+        while True:
+            if node[0] == name:
+                return
+            distance = levenshtein(key, node[1])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (name, key, {})
+                self.size += 1
+                return
+            node = child
+
+    def remove(self, name):
+        """Remove a name from the tree"""
+        if name in self._deleted or not self._contains(name):
+            return
+
+        self._deleted.add(name)
+        self.size -= 1
+        if len(self._deleted) > self.size:
+            live = [node_name for node_name in self._walk() if node_name not in self._deleted]
+            self.__init__(live)
+
+    def _contains(self, name):
+        key = name.lower()
+        node = self._root
+        while node is not None:
+            if node[0] == name:
+                return True
+            node = node[2].get(levenshtein(key, node[1]))
+        return False
+
+    def _walk(self):
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            yield node[0]
+            stack.extend(node[2].values())
+
+    def search(self, query, max_distance=2, k=3):
+        """Get up to k names within max_distance of the query, closest first"""
+        if self._root is None:
+            return []
+
+        key = query.lower()
+        matches = []
+        stack = [self._root]
+        while stack:
+            name, node_key, children = stack.pop()
+            distance = levenshtein(key, node_key)
+            if distance <= max_distance and name not in self._deleted and name != query:
+                matches.append((distance, name))
+            # Triangle inequality: only children in [d - max, d + max] can match
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+
+        matches.sort()
+        return [name for _, name in matches[:k]]
@@ -0,0 +1,106 @@
+"""Per-handler latency instrumentation and profiling hooks"""
+import asyncio
+import contextvars
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import time
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger("bot.instrumentation")
+
+# Seconds of awaited I/O per kind ("db", "discord") for the handler running in this context
+_io_times = contextvars.ContextVar("io_times", default=None)
+
+@asynccontextmanager
+async def io_timer(kind):
+    """Attribute the time spent inside the block to the current handler's `kind` I/O"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        times = _io_times.get()
+        if times is not None:
+            times[kind] = times.get(kind, 0.0) + time.perf_counter() - start
+
+def track_io(kind):
+    """Decorator form of io_timer for coroutine functions"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            async with io_timer(kind):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def instrument(kind):
+    """
+    Record wall time and awaited I/O time of an event handler or command.
+
+    The decorated coroutine must be a method of an object with a `bot`
+    attribute. Results go to the `handler_latency_seconds` and
+    `handler_io_seconds` histograms, labelled with `kind` and the handler name.
+    """
+    def decorator(func):
+        name = func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            times = {}
+            token = _io_times.set(times)
+            start = time.perf_counter()
+            try:
+                return await func(self, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                _io_times.reset(token)
+
+                metrics = self.bot.metrics
+                metrics.histogram(
+                    "handler_latency_seconds", "Wall time spent in event handlers and commands", ("kind", "handler")
+                ).observe(elapsed, kind, name)
+                io_latency = metrics.histogram(
+                    "handler_io_seconds", "Time handlers spent awaiting I/O", ("kind", "handler", "io")
+                )
+                for io_kind, io_time in times.items():
+                    io_latency.observe(io_time, kind, name, io_kind)
+        return wrapper
+    return decorator
+
+class Profiler:
+    """Opt-in sampling of the whole event loop thread with cProfile"""
+
+    def __init__(self, directory="profiles"):
+        self.directory = directory
+        self.running = False
+
+    async def run(self, seconds):
+        """
+        Profile everything the event loop runs for a number of seconds.
+
+        Returns:
+            tuple: Path of the dumped pstats file and a text summary of the top functions.
+        """
+        if self.running:
+            raise RuntimeError("A profile is already running")
+
+        self.running = True
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+            self.running = False
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"profile-{time.strftime('%Y%m%d-%H%M%S')}.pstats")
+        profile.dump_stats(path)
+        logger.info(f"Wrote {seconds}s profile to {path}")
+
+        summary = io.StringIO()
+        pstats.Stats(profile, stream=summary).strip_dirs().sort_stats("cumulative").print_stats(15)
+        return path, summary.getvalue()
@@ -0,0 +1,175 @@
+"""Gateway lifecycle: reconnect tracking, restarts with backoff and clean shutdown"""
+import asyncio
+import logging
+import random
+import signal
+import time
+
+import discord
+
+logger = logging.getLogger("bot.lifecycle")
+
+# Upper bounds in seconds, from a quick RESUME to a long outage
+DOWNTIME_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+# Label used for outages of the whole client rather than a single shard
+ALL_SHARDS = "all"
+
+class ConnectionTracker:
+    """
+    Record gateway disconnects and how they were recovered as metrics.
+
+    discord.py resumes a shard's session by itself after most disconnects;
+    this only measures how often that happens and how long it took.
+    """
+
+    def __init__(self, metrics):
+        # shard ID (or ALL_SHARDS) -> monotonic time it went down
+        self.disconnected_at = {}
+
+        self.reconnects = metrics.counter(
+            "gateway_reconnects_total", "Gateway reconnects by shard and how the session was restored",
+            ("shard", "kind")
+        )
+        self.downtime = metrics.histogram(
+            "gateway_downtime_seconds", "Time from a disconnect until the gateway was usable again",
+            ("shard",), buckets=DOWNTIME_BUCKETS
+        )
+        metrics.gauge(
+            "gateway_disconnected", "Shards (or the whole client) currently disconnected",
+            lambda: len(self.disconnected_at)
+        )
+
+    def disconnected(self, shard_id=ALL_SHARDS):
+        """Note that a shard, or the whole client, lost its connection"""
+        self.disconnected_at.setdefault(shard_id, time.monotonic())
+
+    def reconnected(self, shard_id, kind):
+        """
+        Note that a shard is usable again.
+
+        Args:
+            kind (str): "resume" if the session was resumed, "identify" if a new
+                session had to be started, "restart" after a full client restart.
+        """
+        start = self.disconnected_at.pop(shard_id, None)
+        if start is None:
+            # First connection, nothing was down
+            return
+
+        downtime = time.monotonic() - start
+        self.reconnects.inc(str(shard_id), kind)
+        self.downtime.observe(downtime, str(shard_id))
+        logger.info(f"Shard {shard_id} back after {downtime:.1f}s ({kind})")
+
+class BotLifecycle:
+    """
+    Run the bot until it's told to stop, restarting the gateway connection only
+    when discord.py gives up on it.
+
+    Shard-level disconnects are resumed by discord.py without leaving
+    Client.start. When start() fails or returns, only the gateway and HTTP
+    session are closed and reset; the database connection, caches and
+    cooldowns stay on the bot. They are released once, by shutdown().
+    """
+
+    def __init__(self, bot, keepalive=None, max_retries=20, backoff_base=1.0, max_backoff=300.0):
+        self.bot = bot
+        self.keepalive = keepalive
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+
+        self.stopping = False
+        self._stopped = asyncio.Event()
+
+        self.restarts = bot.metrics.counter(
+            "gateway_restarts_total", "Full gateway restarts by the lifecycle manager, by reason", ("reason",)
+        )
+
+    async def run(self):
+        """Start the keepalive server and keep the bot connected until stop() or a fatal error"""
+        self.install_signal_handlers()
+        if self.keepalive is not None:
+            await self.keepalive.start()
+
+        try:
+            await self.run_gateway()
+        finally:
+            await self.shutdown()
+
+    async def run_gateway(self):
+        """Connect to the gateway, restarting with backoff whenever the connection is lost for good"""
+        retry_count = 0
+
+        while not self.stopping:
+            try:
+                if self.bot.is_closed():
+                    # A previous attempt closed the client; reset discord.py's state, not ours
+                    self.bot.clear()
+                await self.bot.run_bot()
+                if self.stopping:
+                    return
+                reason = "closed"
+                logger.warning("Gateway connection closed, restarting")
+
+            except (discord.LoginFailure, discord.PrivilegedIntentsRequired) as e:
+                logger.critical(f"Cannot connect to Discord, check BOT_TOKEN and the bot's intents: {e}")
+                raise SystemExit(1)
+
+            except discord.HTTPException as e:
+                reason = "rate_limited" if e.status == 429 else "http_error"
+                logger.error(f"HTTP error from Discord: {e}")
+
+            except Exception as e:
+                reason = type(e).__name__
+                logger.error(f"Gateway error: {e}")
+
+            # An outage after a successful connection starts a fresh count
+            if self.bot.is_ready():
+                retry_count = 0
+
+            # Only the gateway is torn down; the next attempt starts a new session
+            await self.bot.close()
+            self.bot.connections.disconnected()
+            self.restarts.inc(reason)
+            retry_count += 1
+            if retry_count > self.max_retries:
+                logger.critical(f"Maximum retry attempts ({self.max_retries}) reached. Exiting.")
+                raise SystemExit(1)
+
+            # Exponential backoff with jitter
+            backoff = min(self.max_backoff, self.backoff_base * (2 ** retry_count + random.random()))
+            logger.info(f"Restarting in {backoff:.2f} seconds... (attempt {retry_count}/{self.max_retries})")
+            try:
+                await asyncio.wait_for(self._stopped.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        """Ask the bot to shut down, e.g. on SIGTERM"""
+        if self.stopping:
+            return
+        logger.info("Shutting down")
+        self.stopping = True
+        self._stopped.set()
+        asyncio.get_running_loop().create_task(self.bot.close())
+
+    def install_signal_handlers(self):
+        """Shut down cleanly when the platform stops the process"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                # Not supported on Windows or outside the main thread; KeyboardInterrupt still works
+                pass
+
+    async def shutdown(self):
+        """Close the gateway, flush state and release the database and keepalive server"""
+        self.stopping = True
+        try:
+            await self.bot.shutdown()
+        finally:
+            if self.keepalive is not None:
+                await self.keepalive.stop()
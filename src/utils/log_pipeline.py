@@ -0,0 +1,119 @@
+"""Queue-backed logging so handlers on the event loop only pay for an enqueue"""
+import atexit
+import json
+import logging
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves all formatting to the background writer"""
+
+    def prepare(self, record):
+        # The stock implementation formats the record on the calling thread;
+        # records here only carry immutable args, so they can be passed as-is.
+        return record
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def setup_logging(config):
+    """
+    Route all logging through a queue drained by a background thread.
+
+    Returns:
+        QueueListener: The running listener; it is stopped automatically at exit.
+    """
+    writer = logging.StreamHandler()
+    writer.setFormatter(JsonFormatter() if config.log_format == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, writer, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.handlers[:] = [DeferredQueueHandler(log_queue)]
+    root.setLevel(logging.INFO)
+    return listener
+
+class MessageLogger:
+    """Sampled logging of the messages the bot sees"""
+
+    VERBOSITIES = ("off", "metadata", "content")
+
+    def __init__(self, config, logger):
+        """
+        Initialize the message logger.
+
+        Args:
+            config (Config): Provides the default sample rate and verbosity, and
+                per-guild overrides.
+            logger (logging.Logger): Logger the sampled messages are written to.
+        """
+        if config.message_log_verbosity not in self.VERBOSITIES:
+            raise ValueError(f"Invalid message log verbosity: {config.message_log_verbosity}")
+
+        self.logger = logger
+        self.default = (config.message_log_sample_rate, config.message_log_verbosity)
+        self.guilds = parse_guild_overrides(config.message_log_guilds, self.default)
+
+    def log(self, message):
+        """Enqueue a log record for a message, subject to its guild's sampling"""
+        rate, verbosity = self.guilds.get(message.guild.id, self.default)
+        if verbosity == "off" or (rate < 1.0 and random.random() >= rate):
+            return
+
+        fields = {
+            'guild_id': message.guild.id,
+            'channel_id': message.channel.id,
+            'author_id': message.author.id,
+            'message_id': message.id,
+        }
+        if verbosity == "content":
+            fields['content'] = message.content
+            self.logger.info(
+                "%s | %s | %s: %s",
+                message.guild.name, message.channel.name, message.author.name, message.content,
+                extra={'fields': fields}
+            )
+        else:
+            self.logger.info(
+                "%s | %s | %s",
+                message.guild.name, message.channel.name, message.author.name,
+                extra={'fields': fields}
+            )
+
+def parse_guild_overrides(spec, default):
+    """
+    Parse per-guild overrides of the form "<guild_id>=<rate>[:<verbosity>],...".
+
+    :param spec: The override string, e.g. "1234=0.1,5678=1:metadata".
+    :param default: The (rate, verbosity) used for missing parts.
+    :return: A dict mapping guild IDs to (rate, verbosity).
+    """
+    overrides = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        guild_id, _, value = item.partition("=")
+        rate, _, verbosity = value.partition(":")
+        verbosity = verbosity or default[1]
+        if verbosity not in MessageLogger.VERBOSITIES:
+            raise ValueError(f"Invalid message log verbosity for guild {guild_id}: {verbosity}")
+        overrides[int(guild_id)] = (float(rate) if rate else default[0], verbosity)
+    return overrides
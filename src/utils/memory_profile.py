@@ -0,0 +1,72 @@
+"""Gateway intents and discord.py cache settings for each memory profile"""
+import discord
+
+# lean: only the gateway events and caches the bot uses
+# full: discord.py's defaults plus the members intent, as the bot used to run
+MEMORY_PROFILES = ('lean', 'full')
+
+# discord.py's default message cache size
+FULL_MAX_MESSAGES = 1000
+
+def profile_intents(profile):
+    """Get the intents a memory profile starts from"""
+    if profile == 'full':
+        intents = discord.Intents.default()
+        intents.message_content = True
+        intents.members = True
+        return intents
+
+    # Guild metadata and guild/DM messages with their content are all the bot reads;
+    # button presses on the help pages are interactions, which need no intent
+    return discord.Intents(guilds=True, guild_messages=True, dm_messages=True, message_content=True)
+
+def _flag_names(spec):
+    return [name.strip() for name in spec.split(",") if name.strip()]
+
+def apply_intent_overrides(intents, spec):
+    """Turn intents on ("members") or off ("-typing") from a comma-separated list"""
+    for name in _flag_names(spec):
+        enabled = not name.startswith("-")
+        name = name.lstrip("+-")
+        if name not in discord.Intents.VALID_FLAGS:
+            raise ValueError(f"Unknown intent '{name}' in INTENTS")
+        setattr(intents, name, enabled)
+    return intents
+
+def member_cache_flags(profile, intents, spec):
+    """Get the member cache flags from MEMBER_CACHE, or the profile's if it's empty"""
+    spec = spec.strip().lower()
+    if spec == "all" or (not spec and profile == 'full'):
+        # Everything the intents allow
+        return discord.MemberCacheFlags.from_intents(intents)
+    if spec in ("", "none"):
+        # The bot's own member is always cached, which is all guild.me needs
+        return discord.MemberCacheFlags.none()
+
+    flags = discord.MemberCacheFlags.none()
+    for name in _flag_names(spec):
+        if name not in discord.MemberCacheFlags.VALID_FLAGS:
+            raise ValueError(f"Unknown member cache flag '{name}' in MEMBER_CACHE")
+        setattr(flags, name, True)
+    return flags
+
+def gateway_options(config):
+    """
+    Get the intents, member_cache_flags and max_messages arguments for the bot.
+
+    The lean profile keeps no member or message cache: message authors come
+    with every message, and !quote has its own bounded recent-message cache.
+    """
+    profile = config.memory_profile
+    intents = apply_intent_overrides(profile_intents(profile), config.intents)
+
+    if config.max_messages is None:
+        max_messages = FULL_MAX_MESSAGES if profile == 'full' else None
+    else:
+        max_messages = config.max_messages or None
+
+    return {
+        'intents': intents,
+        'member_cache_flags': member_cache_flags(profile, intents, config.member_cache),
+        'max_messages': max_messages,
+    }
@@ -0,0 +1,54 @@
+"""Bounded cache of recently seen messages, used to resolve quotes without an API call"""
+from collections import OrderedDict
+
+class MessageCache:
+    """Per-channel LRU of recent messages, with an LRU over channels on top"""
+
+    def __init__(self, per_channel=100, max_channels=1000):
+        """
+        Initialize an empty cache.
+
+        Args:
+            per_channel (int): Messages remembered per channel. 0 disables the cache.
+            max_channels (int): Channels remembered before the least recently active is dropped.
+        """
+        self.per_channel = per_channel
+        self.max_channels = max_channels
+
+        # channel_id -> OrderedDict(message_id -> message)
+        self._channels = OrderedDict()
+
+    def add(self, message):
+        """Remember a message, evicting the oldest one of its channel if needed"""
+        if not self.per_channel:
+            return
+
+        channel_id = message.channel.id
+        messages = self._channels.get(channel_id)
+        if messages is None:
+            messages = self._channels[channel_id] = OrderedDict()
+            if len(self._channels) > self.max_channels:
+                self._channels.popitem(last=False)
+        else:
+            self._channels.move_to_end(channel_id)
+
+        messages[message.id] = message
+        messages.move_to_end(message.id)
+        if len(messages) > self.per_channel:
+            messages.popitem(last=False)
+
+    def get(self, channel_id, message_id):
+        """Get a remembered message, or None"""
+        messages = self._channels.get(channel_id)
+        if messages is None:
+            return None
+        return messages.get(message_id)
+
+    def remove(self, channel_id, message_id):
+        """Forget a message, e.g. after it was edited or deleted"""
+        messages = self._channels.get(channel_id)
+        if messages is not None:
+            messages.pop(message_id, None)
+
+    def __len__(self):
+        return sum(len(messages) for messages in self._channels.values())
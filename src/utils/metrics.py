@@ -0,0 +1,130 @@
+"""Minimal in-process metrics with Prometheus text exposition"""
+from bisect import bisect_left
+from collections import defaultdict
+
+# Upper bounds in seconds, suited to handler and API latencies
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class Counter:
+    """Monotonically increasing count, optionally split by labels"""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = defaultdict(float)
+
+    def inc(self, *label_values, amount=1):
+        """Increase the count for a set of label values"""
+        self.values[label_values] += amount
+
+    def samples(self):
+        for label_values, value in self.values.items():
+            yield self.name, _format_labels(self.labels, label_values), value
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, callback, labels=()):
+        """
+        Args:
+            callback (callable): Returns a number, or a dict mapping tuples of
+                label values to numbers when the gauge has labels.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.callback = callback
+
+    def samples(self):
+        value = self.callback()
+        if not self.labels:
+            yield self.name, "", value
+            return
+        for label_values, sample in value.items():
+            yield self.name, _format_labels(self.labels, label_values), sample
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets"""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self.counts = {}
+        self.sums = defaultdict(float)
+
+    def observe(self, value, *label_values):
+        """Record a value for a set of label values"""
+        counts = self.counts.get(label_values)
+        if counts is None:
+            counts = self.counts[label_values] = [0] * (len(self.buckets) + 1)
+        counts[bisect_left(self.buckets, value)] += 1
+        self.sums[label_values] += value
+
+    def snapshot(self, *label_values):
+        """Get (count, sum) for a set of label values"""
+        counts = self.counts.get(label_values)
+        return (sum(counts) if counts else 0), self.sums.get(label_values, 0.0)
+
+    def samples(self):
+        for label_values, counts in self.counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", _format_labels(self.labels, label_values, ("le", bound)), cumulative
+            yield f"{self.name}_sum", _format_labels(self.labels, label_values), self.sums[label_values]
+            yield f"{self.name}_count", _format_labels(self.labels, label_values), cumulative
+
+class MetricsRegistry:
+    """Collection of named metrics"""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def _register(self, cls, name, *args, **kwargs):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(name, *args, **kwargs)
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        """Get or create a counter"""
+        return self._register(Counter, name, documentation, labels)
+
+    def gauge(self, name, documentation, callback, labels=()):
+        """Get or create a gauge"""
+        return self._register(Gauge, name, documentation, callback, labels)
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        """Get or create a histogram"""
+        return self._register(Histogram, name, documentation, labels, buckets)
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,160 @@
+"""
+Online migration from per-guild collections to the single 'pastas' collection.
+
+Run the bot with DB_SCHEMA=migrating while this runs so that new writes land
+in both schemas, then switch to DB_SCHEMA=single once it reports no
+differences. Usage: python -m src.utils.migrate [--batch-size N] [--drop-legacy]
+"""
+import argparse
+import asyncio
+import logging
+import os
+
+from dotenv import load_dotenv
+from pymongo import AsyncMongoClient, DeleteOne, UpdateOne
+
+from src.utils.db import PASTAS_COLLECTION
+
+logger = logging.getLogger("bot.migrate")
+
+# Compare-and-fix passes before a guild that keeps changing is reported with differences
+VERIFY_ROUNDS = 3
+
+async def delete_stale(legacy, pastas, candidates):
+    """
+    Delete the candidate pastas documents whose command is still missing from the legacy collection.
+
+    :param candidates: Dict of command name to pastas document _id, for commands the copy pass didn't see.
+    :return: Number of documents deleted.
+    """
+    # Commands added through the dual-write after the copy cursor passed them exist in both schemas
+    async for document in legacy.find({'_id': {'$in': list(candidates)}}, {'_id': 1}):
+        del candidates[document['_id']]
+    if not candidates:
+        return 0
+    result = await pastas.bulk_write([DeleteOne({'_id': _id}) for _id in candidates.values()], ordered=False)
+    return result.deleted_count
+
+async def copy_commands(legacy, pastas, guild_id, names):
+    """
+    Make the pastas collection match the legacy collection for the given commands.
+
+    Content is read from the legacy collection right before writing, so edits
+    and removals made through the dual-write while the batch was being
+    collected aren't undone. Commands no longer in the legacy collection are
+    deleted from the pastas collection.
+
+    :return: Set of the names that still exist in the legacy collection.
+    """
+    current = {}
+    async for document in legacy.find({'_id': {'$in': list(names)}}):
+        current[document['_id']] = document['content']
+
+    requests = [
+        UpdateOne({'guild_id': guild_id, 'name': name}, {'$set': {'content': content}}, upsert=True)
+        for name, content in current.items()
+    ]
+    requests += [DeleteOne({'guild_id': guild_id, 'name': name}) for name in names if name not in current]
+    if requests:
+        await pastas.bulk_write(requests, ordered=False)
+    return set(current)
+
+async def find_differences(legacy, pastas, guild_id):
+    """Get the names of commands that are missing from either collection or whose content differs"""
+    expected = {document['_id']: document['content'] async for document in legacy.find({})}
+    actual = {
+        document['name']: document['content']
+        async for document in pastas.find({'guild_id': guild_id}, {'name': 1, 'content': 1})
+    }
+    return {name for name in expected.keys() | actual.keys() if expected.get(name) != actual.get(name)}
+
+async def migrate_guild(db, guild_id, batch_size):
+    """
+    Copy one guild's collection into the pastas collection in bulk batches.
+
+    Commands that no longer exist in the legacy collection (e.g. removed while
+    the migration was running) are deleted from the pastas collection afterwards.
+    Whether a command is gone is checked against the legacy collection at
+    delete time, not against what the copy saw, so commands added meanwhile
+    are kept.
+
+    A dual-write can still land between reading a batch and writing it, so
+    both collections are compared afterwards and any differences are copied
+    again, up to VERIFY_ROUNDS times.
+
+    :return: Tuple of (commands copied, stale commands deleted, commands that still differ).
+    """
+    legacy = db[str(guild_id)]
+    pastas = db[PASTAS_COLLECTION]
+    names = set()
+    copied = 0
+
+    batch = []
+    async for document in legacy.find({}, {'_id': 1}, batch_size=batch_size):
+        batch.append(document['_id'])
+        if len(batch) >= batch_size:
+            written = await copy_commands(legacy, pastas, guild_id, batch)
+            names |= written
+            copied += len(written)
+            batch = []
+    if batch:
+        written = await copy_commands(legacy, pastas, guild_id, batch)
+        names |= written
+        copied += len(written)
+
+    deleted = 0
+    candidates = {}
+    async for document in pastas.find({'guild_id': guild_id}, {'name': 1}, batch_size=batch_size):
+        if document['name'] not in names:
+            candidates[document['name']] = document['_id']
+        if len(candidates) >= batch_size:
+            deleted += await delete_stale(legacy, pastas, candidates)
+            candidates = {}
+    if candidates:
+        deleted += await delete_stale(legacy, pastas, candidates)
+
+    differences = await find_differences(legacy, pastas, guild_id)
+    for _ in range(VERIFY_ROUNDS):
+        if not differences:
+            break
+        logger.info(f"Guild {guild_id}: copying {len(differences)} commands changed during the migration again")
+        await copy_commands(legacy, pastas, guild_id, list(differences))
+        differences = await find_differences(legacy, pastas, guild_id)
+
+    return copied, deleted, len(differences)
+
+async def migrate(uri, batch_size=1000, drop_legacy=False):
+    """Migrate every per-guild collection of the bot's database"""
+    client = AsyncMongoClient(uri)
+    try:
+        db = client['Morton']
+        await db[PASTAS_COLLECTION].create_index([('guild_id', 1), ('name', 1)], unique=True, name='guild_id_name')
+
+        # Guild collections are named after the numeric guild ID
+        guild_ids = sorted(int(name) for name in await db.list_collection_names() if name.isdigit())
+        logger.info(f"Migrating {len(guild_ids)} guild collections")
+
+        for guild_id in guild_ids:
+            copied, deleted, differences = await migrate_guild(db, guild_id, batch_size)
+            logger.info(f"Guild {guild_id}: copied {copied}, deleted {deleted} stale, {differences} differences")
+
+            # Only drop once names and content match; equal counts alone can hide edits and removals
+            if drop_legacy and not differences:
+                await db.drop_collection(str(guild_id))
+                logger.info(f"Guild {guild_id}: dropped legacy collection")
+    finally:
+        await client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents per bulk write")
+    parser.add_argument("--drop-legacy", action="store_true",
+                        help="Drop each per-guild collection once the pastas collection matches it")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv()
+    asyncio.run(migrate(os.environ["DATABASE_URI"], args.batch_size, args.drop_legacy))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""Rate-limit-aware outbound message scheduling"""
+import asyncio
+import logging
+import time
+from collections import deque
+
+import discord
+
+from src.utils.instrumentation import io_timer
+
+logger = logging.getLogger("bot.sender")
+
+class TokenBucket:
+    """Token bucket allowing `rate` sends every `per` seconds"""
+
+    def __init__(self, rate, per):
+        self.capacity = rate
+        self.tokens = float(rate)
+        self.fill_rate = rate / per
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+        self.updated = now
+        return now
+
+    def delay(self):
+        """Get the number of seconds until a token is available"""
+        now = self._refill()
+        if self.blocked_until > now:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.fill_rate
+
+    def consume(self):
+        """Take a token from the bucket"""
+        self._refill()
+        self.tokens -= 1
+
+    def idle_after(self):
+        """Get the number of seconds until the bucket is full and unblocked again"""
+        now = self._refill()
+        return max(self.blocked_until - now, (self.capacity - self.tokens) / self.fill_rate, 0.0)
+
+    def pause(self, seconds):
+        """Drain the bucket and block it for a number of seconds, e.g. after a 429"""
+        self._refill()
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+class SendJob:
+    """A sequence of messages to send to one destination, which can be cancelled and resumed"""
+
+    def __init__(self, destination, chunks, **kwargs):
+        self.destination = destination
+        self.chunks = tuple(chunks)
+        self.kwargs = kwargs
+        self.position = 0
+        self.cancelled = False
+        self.result = asyncio.get_running_loop().create_future()
+
+    @property
+    def finished(self):
+        return self.result.done()
+
+    def cancel(self):
+        """Stop sending after the chunk currently in flight"""
+        self.cancelled = True
+
+    async def wait(self):
+        """Wait for the last chunk to be sent and return its message"""
+        return await self.result
+
+def destination_key(destination):
+    """Get a hashable key identifying where a message is sent"""
+    if isinstance(destination, (discord.User, discord.Member)):
+        return ('user', destination.id)
+    # A DM channel shares the user's key, since both send over the same route. The user's ID is
+    # used rather than the channel's because a user's DM channel isn't known until one is opened
+    if isinstance(destination, discord.DMChannel) and destination.recipient is not None:
+        return ('user', destination.recipient.id)
+    return ('channel', destination.id)
+
+def rate_limit_delay(error):
+    """Get how long to back off after a rate limit error, or None if it isn't one"""
+    if isinstance(error, discord.RateLimited):
+        return error.retry_after
+    if isinstance(error, discord.HTTPException) and error.status == 429:
+        headers = getattr(error.response, 'headers', None) or {}
+        reset_after = headers.get('X-RateLimit-Reset-After') or headers.get('Retry-After')
+        return float(reset_after) if reset_after else 1.0
+    return None
+
+def is_global_rate_limit(error):
+    """Check whether a rate limit error applies to the whole bot rather than one route"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    return headers.get('X-RateLimit-Global') == 'true' or headers.get('X-RateLimit-Scope') == 'global'
+
+class SendScheduler:
+    """
+    Central outbound queue.
+
+    Each destination gets its own FIFO queue, token bucket and worker task, so a
+    long DM stream to one user never holds up sends to other channels. All
+    workers additionally share a global bucket that is handed out in FIFO
+    order, which keeps destinations fair under load.
+    """
+
+    def __init__(self, rate=5, per=5.0, global_rate=50, send_func=None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            rate (int): Messages allowed per destination every `per` seconds.
+            per (float): Window of the per-destination bucket in seconds.
+            global_rate (int): Messages allowed per second across all destinations.
+            send_func (callable): Coroutine function `(destination, content, **kwargs)`
+                performing the actual send. Defaults to `destination.send`.
+        """
+        self.rate = rate
+        self.per = per
+        self.send_func = send_func or (lambda destination, content, **kwargs: destination.send(content, **kwargs))
+
+        self._queues = {}
+        self._buckets = {}
+        self._workers = {}
+        self._global_bucket = TokenBucket(global_rate, 1.0)
+        self._global_lock = asyncio.Lock()
+
+        self.sent = 0
+        self.rate_limited = 0
+
+    async def send(self, destination, content=None, **kwargs):
+        """Send a single message through the queue and return it once sent"""
+        async with io_timer("discord"):
+            return await self.submit(destination, [content], **kwargs).wait()
+
+    def submit(self, destination, chunks, **kwargs):
+        """Queue a sequence of messages and return the job without waiting for it"""
+        job = SendJob(destination, chunks, **kwargs)
+        if job.chunks:
+            self._enqueue(job)
+        else:
+            job.result.set_result(None)
+        return job
+
+    def resume(self, job):
+        """Continue a cancelled job from the first chunk that wasn't sent"""
+        if job.finished:
+            return
+        job.cancelled = False
+        self._enqueue(job)
+
+    async def close(self):
+        """Stop every worker and cancel the jobs still queued, e.g. at shutdown"""
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        for queue in self._queues.values():
+            for job in queue:
+                if not job.finished:
+                    job.result.cancel()
+        self._queues.clear()
+        self._buckets.clear()
+
+    def _enqueue(self, job):
+        key = destination_key(job.destination)
+        queue = self._queues.setdefault(key, deque())
+        if job not in queue:
+            queue.append(job)
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._run(key))
+
+    async def _acquire(self, bucket):
+        while (delay := bucket.delay()) > 0:
+            await asyncio.sleep(delay)
+
+        async with self._global_lock:
+            while (delay := self._global_bucket.delay()) > 0:
+                await asyncio.sleep(delay)
+            self._global_bucket.consume()
+
+        bucket.consume()
+
+    async def _run(self, key):
+        queue = self._queues[key]
+        bucket = self._buckets.setdefault(key, TokenBucket(self.rate, self.per))
+
+        try:
+            while queue:
+                job = queue[0]
+                if job.cancelled:
+                    queue.popleft()
+                    continue
+
+                await self._acquire(bucket)
+
+                try:
+                    message = await self.send_func(job.destination, job.chunks[job.position], **job.kwargs)
+                except Exception as e:
+                    delay = rate_limit_delay(e)
+                    if delay is None:
+                        queue.popleft()
+                        job.result.set_exception(e)
+                        continue
+
+                    # Retry the same chunk once the route (or the whole bot) frees up
+                    self.rate_limited += 1
+                    logger.warning(f"Rate limited sending to {key}, backing off {delay:.2f}s")
+                    if is_global_rate_limit(e):
+                        self._global_bucket.pause(delay)
+                    bucket.pause(delay)
+                    continue
+
+                self.sent += 1
+                job.position += 1
+                if job.position >= len(job.chunks):
+                    queue.popleft()
+                    job.result.set_result(message)
+        finally:
+            del self._workers[key]
+            if not queue:
+                del self._queues[key]
+                self._prune_bucket(key, bucket)
+
+    def _prune_bucket(self, key, bucket):
+        """Forget an idle destination's bucket once dropping it can't let a burst through"""
+        if key in self._workers or self._buckets.get(key) is not bucket:
+            return
+        delay = bucket.idle_after()
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._prune_bucket, key, bucket)
+        else:
+            del self._buckets[key]
@@ -0,0 +1,258 @@
+"""Embedded SQLite storage backend"""
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.utils.db import BaseDatabase
+from src.utils.instrumentation import io_timer, track_io
+from src.utils.usage import usage_hour
+
+logger = logging.getLogger("bot.database.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pastas (
+    guild_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (guild_id, name)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS guild_settings (
+    guild_id INTEGER PRIMARY KEY,
+    settings TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS cooldowns (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS usage (
+    guild_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, name, hour)
+) WITHOUT ROWID;
+"""
+
+# Statements are kept as constants so sqlite3's per-connection statement cache
+# reuses the prepared statements instead of re-parsing them on every call.
+SELECT_COMMAND = "SELECT name, content FROM pastas WHERE guild_id = ? AND name = ?"
+SELECT_COMMANDS = "SELECT name, content FROM pastas WHERE guild_id = ? ORDER BY name"
+SELECT_NAMES = "SELECT name FROM pastas WHERE guild_id = ? ORDER BY name"
+EXISTS_COMMAND = "SELECT 1 FROM pastas WHERE guild_id = ? AND name = ?"
+UPSERT_COMMAND = (
+    "INSERT INTO pastas (guild_id, name, content) VALUES (?, ?, ?) "
+    "ON CONFLICT (guild_id, name) DO UPDATE SET content = excluded.content"
+)
+DELETE_COMMAND = "DELETE FROM pastas WHERE guild_id = ? AND name = ?"
+SELECT_SETTINGS = "SELECT settings FROM guild_settings WHERE guild_id = ?"
+UPSERT_SETTINGS = (
+    "INSERT INTO guild_settings (guild_id, settings) VALUES (?, ?) "
+    "ON CONFLICT (guild_id) DO UPDATE SET settings = excluded.settings"
+)
+SELECT_COOLDOWNS = "SELECT key, expires_at FROM cooldowns WHERE expires_at > ?"
+UPSERT_COOLDOWN = (
+    "INSERT INTO cooldowns (key, expires_at) VALUES (?, ?) "
+    "ON CONFLICT (key) DO UPDATE SET expires_at = excluded.expires_at"
+)
+DELETE_EXPIRED_COOLDOWNS = "DELETE FROM cooldowns WHERE expires_at <= ?"
+UPSERT_USAGE = (
+    "INSERT INTO usage (guild_id, name, hour, count) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (guild_id, name, hour) DO UPDATE SET count = count + excluded.count"
+)
+DELETE_EXPIRED_USAGE = "DELETE FROM usage WHERE hour < ?"
+SELECT_TOP_COMMANDS = (
+    "SELECT name, SUM(count) AS uses FROM usage WHERE guild_id = ? AND hour >= ? "
+    "GROUP BY name ORDER BY uses DESC, name LIMIT ?"
+)
+SELECT_USAGE = "SELECT hour, SUM(count) FROM usage WHERE guild_id = ? AND hour >= ? GROUP BY hour"
+SELECT_COMMAND_USAGE = "SELECT hour, count FROM usage WHERE guild_id = ? AND name = ? AND hour >= ?"
+
+# Rows fetched per step when streaming, between which the event loop gets control back
+FETCH_SIZE = 500
+
+def parse_sqlite_uri(uri):
+    """Get the file path from a sqlite:///path/to/file.db or sqlite:file.db URI"""
+    path = uri[len("sqlite:"):]
+    if path.startswith("//"):
+        path = path[2:]
+    return path or "pastas.db"
+
+class SQLiteDatabase(BaseDatabase):
+    """
+    Local file storage using SQLite in WAL mode.
+
+    Point reads run directly on the event loop through a dedicated reader
+    connection; they are primary-key lookups in a local file and finish in
+    well under a millisecond. Writes go through a second connection owned by a
+    single worker thread, which WAL lets run alongside the reader.
+    """
+
+    def __init__(self, uri, usage_retention_days=90):
+        """Open (and create if needed) the database file"""
+        self.path = parse_sqlite_uri(uri)
+        self.usage_retention = usage_retention_days * 86400
+        # Rollups older than this hour have been deleted
+        self.usage_pruned_before = None
+        logger.info(f"Opening SQLite database {self.path}")
+
+        self.writer = self._connect()
+        self.writer.executescript(SCHEMA)
+        self.reader = self._connect()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        return connection
+
+    async def _write(self, func, *args):
+        """Run a function taking the writer connection on the writer thread, inside a transaction"""
+        def transaction():
+            with self.writer:
+                self.writer.execute("BEGIN IMMEDIATE")
+                return func(self.writer, *args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, transaction)
+
+    @track_io("db")
+    async def add_command(self, guild_id, command, content):
+        """Add or update a custom command"""
+        def upsert(connection):
+            is_new = connection.execute(EXISTS_COMMAND, (guild_id, command)).fetchone() is None
+            connection.execute(UPSERT_COMMAND, (guild_id, command, content))
+            return is_new
+        return await self._write(upsert)
+
+    @track_io("db")
+    async def add_commands(self, guild_id, commands, batch_size=1000):
+        """Add or update many custom commands, one transaction per batch"""
+        items = [(guild_id, command, content) for command, content in commands.items()]
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            await self._write(lambda connection: connection.executemany(UPSERT_COMMAND, batch))
+        return len(items)
+
+    @track_io("db")
+    async def remove_command(self, guild_id, command):
+        """Remove a custom command"""
+        return await self._write(lambda connection: connection.execute(DELETE_COMMAND, (guild_id, command)).rowcount > 0)
+
+    @track_io("db")
+    async def get_command(self, guild_id, command):
+        """Get a command's content"""
+        row = self.reader.execute(SELECT_COMMAND, (guild_id, command)).fetchone()
+        return {'_id': row[0], 'content': row[1]} if row else None
+
+    @track_io("db")
+    async def get_all_commands(self, guild_id):
+        """Get all custom commands for a guild"""
+        return [document async for document in self.iter_commands(guild_id)]
+
+    async def iter_commands(self, guild_id):
+        """Stream a guild's custom commands in order"""
+        async with io_timer("db"):
+            cursor = self.reader.execute(SELECT_COMMANDS, (guild_id,))
+            while rows := cursor.fetchmany(FETCH_SIZE):
+                for name, content in rows:
+                    yield {'_id': name, 'content': content}
+                await asyncio.sleep(0)
+
+    async def iter_command_names(self, guild_id):
+        """Stream the names of a guild's custom commands in order"""
+        async with io_timer("db"):
+            cursor = self.reader.execute(SELECT_NAMES, (guild_id,))
+            while rows := cursor.fetchmany(FETCH_SIZE):
+                for (name,) in rows:
+                    yield name
+                await asyncio.sleep(0)
+
+    @track_io("db")
+    async def get_guild_settings(self, guild_id):
+        """Get the settings of a guild"""
+        row = self.reader.execute(SELECT_SETTINGS, (guild_id,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    @track_io("db")
+    async def update_guild_settings(self, guild_id, settings):
+        """Set fields of a guild's settings"""
+        def merge(connection):
+            row = connection.execute(SELECT_SETTINGS, (guild_id,)).fetchone()
+            merged = dict(json.loads(row[0]) if row else {}, **settings)
+            connection.execute(UPSERT_SETTINGS, (guild_id, json.dumps(merged)))
+        await self._write(merge)
+
+    @track_io("db")
+    async def set_user_timezone(self, guild_id, user_id, timezone):
+        """Set or remove one user's timezone in a guild's settings"""
+        # Read and written in one transaction on the writer thread, so concurrent changes for other users survive
+        def merge(connection):
+            row = connection.execute(SELECT_SETTINGS, (guild_id,)).fetchone()
+            settings = json.loads(row[0]) if row else {}
+            user_timezones = settings.setdefault('user_timezones', {})
+            if timezone is None:
+                user_timezones.pop(str(user_id), None)
+            else:
+                user_timezones[str(user_id)] = timezone
+            connection.execute(UPSERT_SETTINGS, (guild_id, json.dumps(settings)))
+        await self._write(merge)
+
+    @track_io("db")
+    async def get_cooldowns(self):
+        """Get persisted cooldowns that haven't expired"""
+        return dict(self.reader.execute(SELECT_COOLDOWNS, (time.time(),)).fetchall())
+
+    @track_io("db")
+    async def save_cooldowns(self, cooldowns):
+        """Persist cooldowns in one transaction, clearing out expired ones"""
+        if not cooldowns:
+            return
+        def save(connection):
+            connection.executemany(UPSERT_COOLDOWN, cooldowns.items())
+            connection.execute(DELETE_EXPIRED_COOLDOWNS, (time.time(),))
+        await self._write(save)
+
+    @track_io("db")
+    async def save_usage(self, usage):
+        """Add usage counts to the hourly rollups in one transaction, clearing out expired hours"""
+        if not usage:
+            return
+        rows = [(guild_id, command, hour, uses) for (guild_id, command, hour), uses in usage.items()]
+        # Rollups expire an hour at a time, so the delete (a scan, as hour isn't indexed) runs at most hourly
+        cutoff = usage_hour(time.time() - self.usage_retention)
+        prune = cutoff != self.usage_pruned_before
+        def save(connection):
+            connection.executemany(UPSERT_USAGE, rows)
+            if prune:
+                connection.execute(DELETE_EXPIRED_USAGE, (cutoff,))
+        await self._write(save)
+        self.usage_pruned_before = cutoff
+
+    @track_io("db")
+    async def get_top_commands(self, guild_id, since, limit=10):
+        """Sum the hourly rollups of a guild per command"""
+        return self.reader.execute(SELECT_TOP_COMMANDS, (guild_id, since, limit)).fetchall()
+
+    @track_io("db")
+    async def get_usage(self, guild_id, since, command=None):
+        """Sum the hourly rollups of a guild, or of one of its commands, per hour"""
+        if command is not None:
+            return dict(self.reader.execute(SELECT_COMMAND_USAGE, (guild_id, command, since)).fetchall())
+        return dict(self.reader.execute(SELECT_USAGE, (guild_id, since)).fetchall())
+
+    @track_io("db")
+    async def ping(self):
+        """Check that the database file is usable"""
+        self.reader.execute("SELECT 1").fetchone()
+
+    async def close(self):
+        """Close the database"""
+        self.executor.shutdown(wait=True)
+        self.reader.close()
+        self.writer.close()
@@ -0,0 +1,121 @@
+"""Templated pastas: placeholders compiled once into a render plan and filled in on every use"""
+import random
+import re
+from functools import lru_cache
+
+# Highest {argN} placeholder a pasta may use
+MAX_ARGS = 9
+
+# {name} or {name:options}; anything that isn't a known placeholder is left as written
+PLACEHOLDER = re.compile(r"\{(\w+)(?::([^{}]*))?\}")
+ARG = re.compile(r"arg(\d+)")
+
+# Placeholders filled from the message that used the pasta
+MESSAGE_FIELDS = {
+    'user': lambda message: message.author.display_name,
+    'mention': lambda message: message.author.mention,
+    'channel': lambda message: message.channel.mention,
+}
+
+class TemplateError(ValueError):
+    """A known placeholder in a pasta is malformed"""
+
+class Template:
+    """
+    A pasta compiled into a str.format string and the values each use has to supply.
+
+    Literal braces are escaped at compile time, so rendering is a single
+    format_map call with no parsing.
+    """
+
+    __slots__ = ('format', 'message_fields', 'arg_count', 'choices', 'uses_count')
+
+    def __init__(self, format, message_fields, arg_count, choices, uses_count):
+        self.format = format
+        # (field, getter) pairs for placeholders taken from the message
+        self.message_fields = message_fields
+        # Highest {argN} used
+        self.arg_count = arg_count
+        # (field, options) pairs for {random:...} placeholders
+        self.choices = choices
+        self.uses_count = uses_count
+
+    def render(self, message, args="", count=0, max_len=2000):
+        """
+        Fill in the placeholders for one use of the pasta.
+
+        Args:
+            message (discord.Message): The message that used the pasta.
+            args (str): The rest of the message after the command name.
+            count (int): How often the pasta has been used, for {count}.
+            max_len (int): Longest output; anything beyond is cut off.
+        """
+        values = {field: getter(message) for field, getter in self.message_fields}
+        if self.arg_count:
+            words = args.split(None, self.arg_count)
+            words += [""] * (self.arg_count - len(words))
+            for i in range(self.arg_count):
+                values[f"arg{i + 1}"] = words[i]
+        for field, options in self.choices:
+            values[field] = random.choice(options)
+        if self.uses_count:
+            values['count'] = count
+        return self.format.format_map(values)[:max_len]
+
+def _escape(text):
+    return text.replace("{", "{{").replace("}", "}}")
+
+@lru_cache(maxsize=4096)
+def compile_template(text):
+    """
+    Compile a pasta into its cached render plan.
+
+    Returns:
+        Template: The render plan, or None if the pasta has no placeholders
+        and is sent as written.
+
+    Raises:
+        TemplateError: If a known placeholder is malformed, e.g. {arg0} or {random:}.
+    """
+    parts = []
+    message_fields = {}
+    arg_count = 0
+    choices = []
+    uses_count = False
+    position = 0
+
+    for match in PLACEHOLDER.finditer(text):
+        name, options = match.groups()
+        arg = ARG.fullmatch(name)
+
+        if name == 'random':
+            if not options:
+                raise TemplateError("{random:...} needs options separated by |, e.g. {random:heads|tails}")
+            field = f"random{len(choices)}"
+            choices.append((field, tuple(options.split("|"))))
+        elif name in MESSAGE_FIELDS or name == 'count' or arg:
+            if options is not None:
+                raise TemplateError(f"{{{name}}} doesn't take options")
+            field = name
+            if arg:
+                index = int(arg.group(1))
+                if not 1 <= index <= MAX_ARGS:
+                    raise TemplateError(f"Arguments go from {{arg1}} to {{arg{MAX_ARGS}}}")
+                field = f"arg{index}"
+                arg_count = max(arg_count, index)
+            elif name == 'count':
+                uses_count = True
+            else:
+                message_fields[name] = MESSAGE_FIELDS[name]
+        else:
+            continue
+
+        parts.append(_escape(text[position:match.start()]))
+        parts.append("{" + field + "}")
+        position = match.end()
+
+    if not parts:
+        return None
+
+    parts.append(_escape(text[position:]))
+    return Template("".join(parts), tuple(message_fields.items()), arg_count, tuple(choices), uses_count)
@@ -1,34 +1,122 @@
-from datetime import datetime, timedelta
-import pytz
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from functools import lru_cache
+import time as _time
+
+# Quotes from the last week are labelled with their weekday rather than a date
+RECENT_DAYS = 7
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# zone name -> (valid until as a POSIX timestamp, start of today, start of the recent window,
+#               UTC offset shared by the whole window or None if it spans a DST change)
+_day_boundaries = {}
+
+@lru_cache(maxsize=None)
+def get_timezone(timezone: str):
+    """
+    Resolve a timezone name once and reuse the zone object afterwards.
+
+    :param timezone: A string representing the timezone (e.g., "America/New_York").
+    :raises pytz.UnknownTimeZoneError: If the name isn't a known timezone.
+    """
+    # pytz loads its zone index on import, so it's deferred until a timestamp is formatted
+    import pytz
+    return pytz.timezone(timezone)
+
+
+def is_valid_timezone(timezone: str) -> bool:
+    """Check whether a string names a known timezone"""
+    import pytz
+    try:
+        get_timezone(timezone)
+    except pytz.UnknownTimeZoneError:
+        return False
+    return True
+
 
 def convert_utc_to_timezone(utc_dt: datetime, timezone: str) -> datetime:
     """
     Convert a UTC datetime object to a specific timezone.
 
-    :param utc_dt: A datetime object in UTC.
+    :param utc_dt: A datetime object in UTC, naive or aware.
     :param timezone: A string representing the target timezone (e.g., "America/New_York").
     :return: A datetime object in the specified timezone.
     """
-    target_tz = pytz.timezone(timezone)
-    return utc_dt.replace(tzinfo=pytz.utc).astimezone(target_tz)
+    if utc_dt.tzinfo is None:
+        utc_dt = utc_dt.replace(tzinfo=dt_timezone.utc)
+    return utc_dt.astimezone(get_timezone(timezone))
+
+
+def _start_of_day(tz, day):
+    return tz.localize(datetime.combine(day, time()))
+
+
+def get_day_boundaries(timezone: str, now: float = None):
+    """
+    Get the start of today and of the recent window in a timezone as aware datetimes,
+    plus the UTC offset used throughout the window (None if it spans a DST change).
+
+    The result is memoized per zone until the zone's next midnight.
+
+    :param now: POSIX timestamp to use instead of the current time.
+    """
+    now = _time.time() if now is None else now
+    cached = _day_boundaries.get(timezone)
+    if cached is not None and cached[0] > now >= cached[1].timestamp():
+        return cached[1:]
+
+    tz = get_timezone(timezone)
+    today = datetime.fromtimestamp(now, tz).date()
+    start = _start_of_day(tz, today)
+    recent = _start_of_day(tz, today - timedelta(days=RECENT_DAYS - 1))
+    end = _start_of_day(tz, today + timedelta(days=1))
+    offset = recent.utcoffset()
+    if end.utcoffset() != offset:
+        offset = None
+
+    _day_boundaries[timezone] = (end.timestamp(), start, recent, offset)
+    return start, recent, offset
+
+
+def _clock(d: datetime) -> str:
+    # Same as strftime('%I:%M %p') in the default locale, without the strftime overhead
+    return f"{(d.hour - 1) % 12 + 1:02d}:{d.minute:02d} {'AM' if d.hour < 12 else 'PM'}"
 
 
 def format_date_for_quotes(d: datetime, timezone: str) -> str:
     """
     Formats the date to be displayed in a quote embed.
     """
-    now = datetime.now()
-
-    localized_date = convert_utc_to_timezone(d, timezone)
-
-    # Check if the date is today
-    if localized_date.date() == now.date():
-        return f"Today at {localized_date.strftime('%I:%M %p')}"
-    
-    # Check if the date is within the last 7 days
-    elif localized_date.date() > (now - timedelta(days=7)).date():
-        return f"{localized_date.strftime('%A')} at {localized_date.strftime('%I:%M %p')}"
-    
-    # Default format for older dates
-    else:
-        return localized_date.strftime('%m/%d/%Y')
\ No newline at end of file
+    return format_dates_for_quotes((d,), timezone)[0]
+
+
+def format_dates_for_quotes(dates, timezone: str) -> list:
+    """
+    Formats several dates for quote embeds in the same timezone, sharing one day boundary lookup.
+    """
+    today, recent, offset = get_day_boundaries(timezone)
+    formatted = []
+    for d in dates:
+        if d.tzinfo is None:
+            d = d.replace(tzinfo=dt_timezone.utc)
+
+        # Default format for older dates
+        if d < recent:
+            localized_date = convert_utc_to_timezone(d, timezone)
+            formatted.append(f"{localized_date.month:02d}/{localized_date.day:02d}/{localized_date.year:04d}")
+            continue
+
+        # Within the window the offset is usually fixed, which skips the zone lookup
+        if offset is not None:
+            localized_date = d.replace(tzinfo=None) + offset
+        else:
+            localized_date = convert_utc_to_timezone(d, timezone)
+
+        # Check if the date is today
+        if d >= today:
+            formatted.append(f"Today at {_clock(localized_date)}")
+
+        # Otherwise it's within the last 7 days
+        else:
+            formatted.append(f"{WEEKDAYS[localized_date.weekday()]} at {_clock(localized_date)}")
+    return formatted
@@ -0,0 +1,88 @@
+"""Trigger phrase matching for easter eggs"""
+import json
+import logging
+
+logger = logging.getLogger("bot.triggers")
+
+# Trie key marking the end of a trigger phrase
+_END = None
+
+class TriggerMatcher:
+    """
+    Prefix trie of trigger phrases.
+
+    A message matches a trigger when it starts with the phrase. Matching walks
+    the trie once from the start of the message, so its cost is bounded by the
+    longest phrase rather than the number of triggers. The longest matching
+    phrase wins.
+    """
+
+    def __init__(self):
+        self._root = {}
+        self.size = 0
+
+    def add(self, phrase, script, word_boundary=True):
+        """
+        Register a trigger phrase.
+
+        Args:
+            phrase (str): Text the message has to start with.
+            script (str): Name of the script to post when the phrase matches.
+            word_boundary (bool): Only match if the phrase isn't followed by
+                more letters or digits, so "In" doesn't match "Infinity".
+        """
+        if not phrase:
+            return
+
+        node = self._root
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[_END] = (script, word_boundary)
+        self.size += 1
+
+    def match(self, text):
+        """Get the script of the longest trigger the text starts with, or None"""
+        node = self._root
+        found = None
+
+        for i, char in enumerate(text):
+            node = node.get(char)
+            if node is None:
+                return found
+            end = node.get(_END)
+            if end is not None:
+                script, word_boundary = end
+                following = text[i + 1:i + 2]
+                if not word_boundary or not following.isalnum():
+                    found = script
+
+        return found
+
+    @classmethod
+    def from_registry(cls, registry, scripts):
+        """
+        Compile a trigger registry into a matcher.
+
+        Args:
+            registry (dict): Maps script names to lists of triggers. A trigger is
+                either a phrase or a dict with "phrase" and "word_boundary" keys.
+            scripts (iterable): Names of the scripts that can be posted. Scripts
+                missing from the registry are triggered by their own name.
+        """
+        matcher = cls()
+        for script in scripts:
+            for trigger in registry.get(script, [script]):
+                if isinstance(trigger, str):
+                    matcher.add(trigger, script)
+                else:
+                    matcher.add(trigger["phrase"], script, trigger.get("word_boundary", True))
+        return matcher
+
+def load_trigger_registry(path):
+    """Load the trigger registry from a JSON file, or an empty one if it doesn't exist"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.warning(f"Trigger registry not found: {path}")
+        return {}
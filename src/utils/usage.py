@@ -0,0 +1,66 @@
+"""Write-behind usage counters for custom commands, rolled up per guild, command and hour"""
+import time
+from collections import Counter
+
+HOUR = 3600
+
+def usage_hour(timestamp):
+    """Get the start of the hour a POSIX timestamp falls in, which is how usage is rolled up"""
+    return int(timestamp // HOUR * HOUR)
+
+class UsageCounters:
+    """
+    Command uses counted in memory until they are flushed to the database.
+
+    Counting is a dict increment, so the pasta hot path never waits on
+    storage; flushing hands over everything counted since the last flush
+    as one batch of (guild_id, command, hour) -> uses increments.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+
+        # (guild_id, command, hour) -> uses not yet written
+        self._pending = Counter()
+
+        # (guild_id, command) -> uses including those already written, for commands that asked for it
+        self._totals = {}
+
+    def hit(self, guild_id, command):
+        """Count one use of a command"""
+        self._pending[guild_id, command, usage_hour(self.clock())] += 1
+        if (guild_id, command) in self._totals:
+            self._totals[guild_id, command] += 1
+
+    def pending_uses(self, guild_id, command):
+        """Get the uses of a command that haven't been written yet"""
+        return sum(
+            uses for (pending_guild_id, pending_command, _), uses in self._pending.items()
+            if pending_guild_id == guild_id and pending_command == command
+        )
+
+    def track_total(self, guild_id, command, stored):
+        """
+        Start keeping a command's total uses up to date, given the uses already written.
+
+        Returns:
+            int: The total, including uses that haven't been written yet.
+        """
+        total = self._totals[guild_id, command] = stored + self.pending_uses(guild_id, command)
+        return total
+
+    def total(self, guild_id, command):
+        """Get a command's total uses, or None if track_total hasn't been called for it"""
+        return self._totals.get((guild_id, command))
+
+    def take_pending(self):
+        """Get and clear the uses counted since the last call"""
+        pending, self._pending = self._pending, Counter()
+        return pending
+
+    def restore(self, pending):
+        """Put back uses that couldn't be written, so the next flush retries them"""
+        self._pending.update(pending)
+
+    def __len__(self):
+        return len(self._pending)
@@ -0,0 +1,47 @@
+"""Pasta cache tests"""
+import unittest
+from unittest import mock
+
+from src.utils.cache import MISSING, PastaCache
+
+class PastaCacheTest(unittest.TestCase):
+    def test_warmed_names_outlive_the_content_ttl(self):
+        cache = PastaCache(ttl=60)
+        cache.load_guild(1, [{'_id': 'pasta', 'content': 'x'}, {'_id': 'copy', 'content': 'y'}])
+
+        later = mock.patch("src.utils.cache.time.monotonic", return_value=10 ** 9)
+        with later:
+            # Content is reloaded from the database, but misses and suggestions still come from the name index
+            self.assertIs(cache.get(1, 'pasta'), MISSING)
+            self.assertIsNone(cache.get(1, 'nope'))
+            self.assertEqual(cache.suggest(1, 'pasat'), ['pasta'])
+
+            cache.put(1, 'new', 'z')
+            cache.invalidate(1, 'copy')
+            self.assertEqual(cache.get_names(1), {'pasta', 'new'})
+            self.assertEqual(cache.suggest(1, 'copi'), [])
+            self.assertEqual(cache.stats()['guilds_warmed'], 1)
+
+    def test_oversized_content_still_updates_the_name_index(self):
+        cache = PastaCache(max_bytes=0)
+        cache.load_guild(1, [{'_id': 'pasta', 'content': 'x'}])
+
+        cache.put(1, 'new', 'y')
+        self.assertIs(cache.get(1, 'pasta'), MISSING)
+        self.assertIs(cache.get(1, 'new'), MISSING)
+        self.assertEqual(cache.get_names(1), {'pasta', 'new'})
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_negative_entries_are_evicted(self):
+        cache = PastaCache(max_bytes=4096)
+        for i in range(10000):
+            cache.put(1, f"typo{i}", None)
+
+        stats = cache.stats()
+        self.assertLessEqual(stats['bytes'], 4096)
+        self.assertLess(stats['entries'], 100)
+        self.assertGreater(stats['evictions'], 9900)
+        self.assertIsNone(cache.get(1, 'typo9999'))
+
+if __name__ == "__main__":
+    unittest.main()
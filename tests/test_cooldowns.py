@@ -0,0 +1,68 @@
+"""Cooldown and spam limit tests"""
+import os
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from benchmarks.fakes import InMemoryDatabase
+from config import Config
+from src.bot import PastaBot
+from src.utils.cooldowns import CooldownStore
+
+class CooldownStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.cooldowns = CooldownStore(clock=lambda: self.now)
+
+    def test_check_doesnt_count_the_action(self):
+        self.assertEqual(self.cooldowns.hit('key', rate=2, per=10), 0.0)
+        self.assertEqual(self.cooldowns.check('key', rate=2, per=10), 0.0)
+        self.assertEqual(self.cooldowns.check('key', rate=2, per=10), 0.0)
+        self.assertEqual(self.cooldowns.hit('key', rate=2, per=10), 0.0)
+
+        self.assertEqual(self.cooldowns.check('key', rate=2, per=10), 5.0)
+        self.assertEqual(self.cooldowns.hit('key', rate=2, per=10), 5.0)
+
+    def test_restored_dirty_buckets_keep_the_latest_expiry(self):
+        self.cooldowns.hit('key', per=10, persist=True)
+        dirty = self.cooldowns.take_dirty()
+        self.now += 20
+        self.cooldowns.hit('key', per=10, persist=True)
+
+        self.cooldowns.restore_dirty(dirty)
+        self.assertEqual(self.cooldowns.take_dirty(), {'key': 1030.0})
+
+class PastaBotCooldownsTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        environ = {
+            "BOT_TOKEN": "offline", "DATABASE_URI": "mongodb://example",
+            "PASTA_USER_RATE": "2", "PASTA_USER_PER": "60", "PASTA_GUILD_RATE": "1", "PASTA_GUILD_PER": "60",
+        }
+        with mock.patch.dict(os.environ, environ):
+            self.bot = PastaBot(Config())
+        self.bot.db = InMemoryDatabase()
+
+    def message(self, user_id):
+        return SimpleNamespace(guild=SimpleNamespace(id=1), author=SimpleNamespace(id=user_id))
+
+    async def test_uses_dropped_by_the_guild_limit_dont_count_against_the_user(self):
+        self.assertFalse(self.bot.is_pasta_rate_limited(self.message(1)))
+        for _ in range(5):
+            self.assertTrue(self.bot.is_pasta_rate_limited(self.message(1)))
+
+        # Only the allowed use was counted, so the user still has room under their own limit
+        self.assertEqual(self.bot.cooldowns.check("pasta_user:1:1", rate=2, per=60), 0.0)
+
+    async def test_failed_cooldown_save_is_logged_and_retried(self):
+        self.bot.config.cooldown_persist = True
+        self.bot.cooldowns.hit("script:1:avengers", per=60, persist=True)
+
+        with mock.patch.object(self.bot.db, "save_cooldowns", side_effect=ConnectionError("database down")):
+            with self.assertLogs("bot", level="ERROR"):
+                await self.bot.save_cooldowns()
+
+        await self.bot.save_cooldowns()
+        self.assertIn("script:1:avengers", self.bot.db.cooldowns)
+
+if __name__ == "__main__":
+    unittest.main()
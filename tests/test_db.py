@@ -0,0 +1,59 @@
+"""MongoDB backend tests against a mocked client, so they run without a MongoDB server"""
+import os
+import unittest
+from unittest import mock
+
+from src.utils.db import Database
+
+def mock_client():
+    """An AsyncMongoClient stand-in whose commands, index builds and queries all succeed"""
+    client = mock.MagicMock()
+    client.admin.command = mock.AsyncMock(return_value={'ok': 1.0})
+    database = client.__getitem__.return_value
+    database.client = client
+    # Every collection of the database is the same mock
+    database.__getitem__.return_value.create_index = mock.AsyncMock()
+    return client
+
+class DatabaseConnectTest(unittest.IsolatedAsyncioTestCase):
+    async def test_connect_creates_the_client_and_pings(self):
+        client = mock_client()
+        with mock.patch("pymongo.AsyncMongoClient", return_value=client) as factory:
+            db = Database("mongodb://example")
+            await db.connect()
+
+        factory.assert_called_once()
+        client.admin.command.assert_awaited_once_with('ping')
+
+    async def test_prepare_database_sets_up_mongodb(self):
+        from config import Config
+        from src.bot import PastaBot
+
+        client = mock_client()
+        environ = {"BOT_TOKEN": "offline", "DATABASE_URI": "mongodb://example"}
+        with mock.patch.dict(os.environ, environ), mock.patch("pymongo.AsyncMongoClient", return_value=client):
+            bot = PastaBot(Config())
+            self.assertTrue(await bot._prepare_database())
+
+        client.admin.command.assert_awaited_once_with('ping')
+        client['Morton']['cooldowns'].create_index.assert_awaited()
+
+class DatabaseSettingsTest(unittest.IsolatedAsyncioTestCase):
+    async def test_user_timezone_writes_only_that_users_field(self):
+        client = mock_client()
+        settings = client['Morton']['settings']
+        settings.update_one = mock.AsyncMock()
+        with mock.patch("pymongo.AsyncMongoClient", return_value=client):
+            db = Database("mongodb://example")
+            await db.connect()
+
+        await db.set_user_timezone(1, 42, "Europe/Paris")
+        await db.set_user_timezone(1, 42, None)
+
+        self.assertEqual(settings.update_one.await_args_list, [
+            mock.call({'_id': 1}, {'$set': {'user_timezones.42': "Europe/Paris"}}, upsert=True),
+            mock.call({'_id': 1}, {'$unset': {'user_timezones.42': ""}}),
+        ])
+
+if __name__ == "__main__":
+    unittest.main()
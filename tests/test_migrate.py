@@ -0,0 +1,147 @@
+"""Tests for the online schema migration against an in-memory stand-in for MongoDB collections"""
+import itertools
+import unittest
+from types import SimpleNamespace
+
+from pymongo import DeleteOne, UpdateOne
+
+from src.utils.db import PASTAS_COLLECTION
+from src.utils.migrate import migrate_guild
+
+GUILD_ID = 1234
+
+def matches(document, query):
+    for field, value in query.items():
+        if isinstance(value, dict) and '$in' in value:
+            if document.get(field) not in value['$in']:
+                return False
+        elif document.get(field) != value:
+            return False
+    return True
+
+class FakeCollection:
+    """The parts of an AsyncCollection migrate_guild uses: find, and bulk_write of UpdateOne/DeleteOne"""
+
+    ids = itertools.count(1)
+
+    def __init__(self, documents=()):
+        self.documents = {document['_id']: dict(document) for document in documents}
+        # Called with the number of documents a find cursor has yielded so far
+        self.on_yield = None
+
+    def insert(self, **document):
+        document.setdefault('_id', next(self.ids))
+        self.documents[document['_id']] = document
+
+    async def find(self, query=None, projection=None, batch_size=None):
+        # A snapshot, like a cursor that has already passed whatever is written meanwhile
+        for count, document in enumerate(list(self.documents.values()), start=1):
+            if matches(document, query or {}):
+                yield dict(document)
+            if self.on_yield is not None:
+                self.on_yield(count)
+
+    async def bulk_write(self, requests, ordered=True):
+        deleted = 0
+        for request in requests:
+            found = [document for document in self.documents.values() if matches(document, request._filter)]
+            if isinstance(request, DeleteOne):
+                if found:
+                    del self.documents[found[0]['_id']]
+                    deleted += 1
+            elif isinstance(request, UpdateOne):
+                if found:
+                    found[0].update(request._doc['$set'])
+                elif request._upsert:
+                    self.insert(**request._filter, **request._doc['$set'])
+        return SimpleNamespace(deleted_count=deleted)
+
+class MigrateGuildTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.legacy = FakeCollection({'_id': f"cmd{i}", 'content': f"pasta {i}"} for i in range(5))
+        self.pastas = FakeCollection()
+        self.db = {str(GUILD_ID): self.legacy, PASTAS_COLLECTION: self.pastas}
+
+    def migrated(self):
+        return {
+            document['name']: document['content']
+            for document in self.pastas.documents.values() if document['guild_id'] == GUILD_ID
+        }
+
+    def pasta(self, name):
+        return next((
+            document for document in self.pastas.documents.values()
+            if document['guild_id'] == GUILD_ID and document['name'] == name
+        ), None)
+
+    async def test_copies_in_batches_and_deletes_removed_commands(self):
+        self.pastas.insert(guild_id=GUILD_ID, name="cmd0", content="outdated")
+        self.pastas.insert(guild_id=GUILD_ID, name="removed", content="gone from the legacy collection")
+        self.pastas.insert(guild_id=GUILD_ID + 1, name="other", content="another guild's command")
+
+        copied, deleted, differences = await migrate_guild(self.db, GUILD_ID, batch_size=2)
+
+        self.assertEqual((copied, deleted, differences), (5, 1, 0))
+        self.assertEqual(self.migrated(), {f"cmd{i}": f"pasta {i}" for i in range(5)})
+        self.assertEqual(len(self.pastas.documents), 6)
+
+    async def test_keeps_commands_added_while_migrating(self):
+        def dual_write(count):
+            # The bot adds a command through the migrating schema once the copy cursor is past the start
+            if count == 2 and 'late' not in self.legacy.documents:
+                self.legacy.insert(_id="late", content="added during the migration")
+                self.pastas.insert(guild_id=GUILD_ID, name="late", content="added during the migration")
+        self.legacy.on_yield = dual_write
+
+        copied, deleted, differences = await migrate_guild(self.db, GUILD_ID, batch_size=2)
+
+        self.assertEqual((copied, deleted, differences), (5, 0, 0))
+        self.assertEqual(self.migrated()['late'], "added during the migration")
+        self.assertEqual(len(self.migrated()), 6)
+
+    async def dual_write_at_every_point(self, write):
+        """Run the migration once per document a legacy cursor yields, with the bot's write landing right after it"""
+        yields = 0
+        def hook(count):
+            nonlocal yields
+            yields += 1
+            if yields == trigger:
+                write()
+
+        trigger = 1
+        while True:
+            self.setUp()
+            yields = 0
+            self.legacy.on_yield = hook
+            with self.subTest(trigger=trigger):
+                _, _, differences = await migrate_guild(self.db, GUILD_ID, batch_size=2)
+                self.assertEqual(differences, 0)
+                self.assertEqual(self.migrated(), {
+                    document['_id']: document['content'] for document in self.legacy.documents.values()
+                })
+            if yields < trigger:
+                break
+            trigger += 1
+
+    async def test_keeps_edits_made_while_migrating(self):
+        def edit():
+            # The bot's add_command updates the legacy collection, then upserts into pastas
+            self.legacy.documents["cmd0"]['content'] = "edited during the migration"
+            document = self.pasta("cmd0")
+            if document is None:
+                self.pastas.insert(guild_id=GUILD_ID, name="cmd0", content="edited during the migration")
+            else:
+                document['content'] = "edited during the migration"
+        await self.dual_write_at_every_point(edit)
+
+    async def test_doesnt_resurrect_commands_removed_while_migrating(self):
+        def remove():
+            # The bot's remove_command deletes from pastas, then the legacy collection
+            document = self.pasta("cmd0")
+            if document is not None:
+                del self.pastas.documents[document['_id']]
+            del self.legacy.documents["cmd0"]
+        await self.dual_write_at_every_point(remove)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+"""Send scheduler tests against a fake send function standing in for Discord's HTTP API"""
+import asyncio
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import discord
+
+from benchmarks.fakes import user_payload
+from src.utils.sender import SendScheduler, destination_key
+
+def rate_limited(retry_after):
+    """The error discord.py raises for a 429 response"""
+    response = SimpleNamespace(status=429, reason="Too Many Requests", headers={'Retry-After': str(retry_after)})
+    return discord.HTTPException(response, "You are being rate limited.")
+
+class FakeEndpoint:
+    """Records what is sent, answering with queued errors first"""
+
+    def __init__(self):
+        self.sent = []
+        self.errors = []
+        # Called with each content before it is sent
+        self.before_send = None
+
+    async def send(self, destination, content, **kwargs):
+        await asyncio.sleep(0)
+        if self.before_send is not None:
+            self.before_send(content)
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((destination.id, content))
+        return content
+
+class SendSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.endpoint = FakeEndpoint()
+        self.scheduler = SendScheduler(rate=100, per=0.05, global_rate=1000, send_func=self.endpoint.send)
+        self.channel = SimpleNamespace(id=1)
+        self.other = SimpleNamespace(id=2)
+
+    async def asyncTearDown(self):
+        await self.scheduler.close()
+
+    async def test_sends_each_destination_in_order(self):
+        first = self.scheduler.submit(self.channel, ["a", "b", "c"])
+        other = self.scheduler.submit(self.other, ["x"])
+        second = self.scheduler.submit(self.channel, ["d"])
+
+        self.assertEqual(await second.wait(), "d")
+        self.assertEqual(await first.wait(), "c")
+        self.assertEqual(await other.wait(), "x")
+        self.assertEqual([content for id, content in self.endpoint.sent if id == 1], ["a", "b", "c", "d"])
+
+    async def test_waits_out_a_rate_limit_and_retries_the_chunk(self):
+        self.endpoint.errors.append(rate_limited(0.1))
+
+        start = time.monotonic()
+        await self.scheduler.submit(self.channel, ["a", "b"]).wait()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        self.assertEqual(self.endpoint.sent, [(1, "a"), (1, "b")])
+        self.assertEqual((self.scheduler.sent, self.scheduler.rate_limited), (2, 1))
+
+    async def test_other_errors_fail_only_their_job(self):
+        self.endpoint.errors.append(discord.Forbidden(SimpleNamespace(status=403, reason="Forbidden"), "Missing Access"))
+        failed = self.scheduler.submit(self.channel, ["a", "b"])
+        sent = self.scheduler.submit(self.channel, ["c"])
+
+        # Not assertRaises: it clears the frames of the traceback, which include the running worker's
+        failed_result, sent_result = await asyncio.gather(failed.wait(), sent.wait(), return_exceptions=True)
+        self.assertIsInstance(failed_result, discord.Forbidden)
+        self.assertEqual(sent_result, "c")
+
+    async def test_cancelled_job_resumes_after_the_last_chunk_sent(self):
+        job = self.scheduler.submit(self.channel, ["a", "b", "c"])
+        self.endpoint.before_send = lambda content: job.cancel() if content == "b" else None
+
+        while self.scheduler._workers:
+            await asyncio.sleep(0.01)
+        self.assertFalse(job.finished)
+        self.assertEqual(job.position, 2)
+
+        self.endpoint.before_send = None
+        self.scheduler.resume(job)
+        self.assertEqual(await job.wait(), "c")
+        self.assertEqual(self.endpoint.sent, [(1, "a"), (1, "b"), (1, "c")])
+
+    async def test_idle_buckets_are_dropped_once_full(self):
+        await self.scheduler.send(self.channel, "a")
+        self.assertIn(destination_key(self.channel), self.scheduler._buckets)
+
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.scheduler._buckets, {})
+        self.assertEqual(self.scheduler._queues, {})
+
+    async def test_close_cancels_workers_and_queued_jobs(self):
+        blocked = asyncio.Event()
+        async def hang(destination, content, **kwargs):
+            await blocked.wait()
+        self.scheduler.send_func = hang
+
+        job = self.scheduler.submit(self.channel, ["a"])
+        await asyncio.sleep(0)
+        await self.scheduler.close()
+
+        self.assertTrue(job.result.cancelled())
+        self.assertEqual((self.scheduler._workers, self.scheduler._queues), ({}, {}))
+
+class DestinationKeyTest(unittest.TestCase):
+    def test_user_and_dm_channel_share_a_key(self):
+        user = discord.User(state=mock.MagicMock(), data=user_payload(5))
+        state = mock.MagicMock()
+        state.store_user.return_value = user
+        dm_channel = discord.DMChannel(me=None, state=state, data={'id': '99', 'type': 1, 'recipients': [user_payload(5)]})
+
+        self.assertEqual(destination_key(user), destination_key(dm_channel))
+        self.assertNotEqual(destination_key(user), destination_key(SimpleNamespace(id=5)))
+
+if __name__ == "__main__":
+    unittest.main()
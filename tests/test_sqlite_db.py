@@ -0,0 +1,58 @@
+"""SQLite backend tests"""
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from src.utils.sqlite_db import SQLiteDatabase
+from src.utils.usage import HOUR, usage_hour
+
+class SQLiteUsageTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = SQLiteDatabase(f"sqlite:///{os.path.join(self.directory.name, 'pastas.db')}", usage_retention_days=2)
+        self.statements = []
+        self.db.writer.set_trace_callback(self.statements.append)
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self.directory.cleanup()
+
+    def deletes(self):
+        return sum(statement.startswith("DELETE FROM usage") for statement in self.statements)
+
+    async def test_rollups_are_summed_and_expired_hours_pruned_at_most_hourly(self):
+        now = usage_hour(time.time())
+        await self.db.save_usage({(1, 'old', now - 3 * 24 * HOUR): 9, (1, 'pasta', now): 1, (1, 'copy', now): 1})
+        await self.db.save_usage({(1, 'pasta', now): 2})
+
+        self.assertEqual(self.deletes(), 1)
+        self.assertEqual(await self.db.get_top_commands(1, 0), [('pasta', 3), ('copy', 1)])
+        self.assertEqual(await self.db.get_usage(1, now, 'pasta'), {now: 3})
+
+        with mock.patch("src.utils.sqlite_db.time.time", return_value=time.time() + HOUR):
+            await self.db.save_usage({(1, 'pasta', now + HOUR): 1})
+        self.assertEqual(self.deletes(), 2)
+
+class SQLiteSettingsTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = SQLiteDatabase(f"sqlite:///{os.path.join(self.directory.name, 'pastas.db')}")
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self.directory.cleanup()
+
+    async def test_concurrent_user_timezones_are_all_kept(self):
+        await self.db.update_guild_settings(1, {'timezone': "UTC"})
+        await asyncio.gather(*(self.db.set_user_timezone(1, user_id, "Asia/Tokyo") for user_id in range(10)))
+        await self.db.set_user_timezone(1, 0, None)
+
+        settings = await self.db.get_guild_settings(1)
+        self.assertEqual(settings['timezone'], "UTC")
+        self.assertEqual(settings['user_timezones'], {str(user_id): "Asia/Tokyo" for user_id in range(1, 10)})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Usage counter tests"""
+import asyncio
+import os
+import unittest
+from unittest import mock
+
+from benchmarks.fakes import FakeGateway, InMemoryDatabase
+from config import Config
+from src.bot import PastaBot
+from src.utils.usage import HOUR, UsageCounters
+
+class UsageCountersTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 100 * HOUR + 10
+        self.usage = UsageCounters(clock=lambda: self.now)
+
+    def test_pending_uses_are_rolled_up_per_hour(self):
+        self.usage.hit(1, 'pasta')
+        self.usage.hit(1, 'pasta')
+        self.now += HOUR
+        self.usage.hit(1, 'pasta')
+        self.usage.hit(2, 'pasta')
+
+        self.assertEqual(self.usage.take_pending(), {
+            (1, 'pasta', 100 * HOUR): 2,
+            (1, 'pasta', 101 * HOUR): 1,
+            (2, 'pasta', 101 * HOUR): 1,
+        })
+        self.assertEqual(len(self.usage), 0)
+
+    def test_totals_add_stored_and_pending_uses(self):
+        self.usage.hit(1, 'pasta')
+        self.assertIsNone(self.usage.total(1, 'pasta'))
+
+        self.assertEqual(self.usage.track_total(1, 'pasta', stored=40), 41)
+        self.usage.hit(1, 'pasta')
+        self.usage.hit(1, 'other')
+        self.assertEqual(self.usage.total(1, 'pasta'), 42)
+
+        # Writing the pending uses doesn't change the total
+        self.usage.take_pending()
+        self.assertEqual(self.usage.total(1, 'pasta'), 42)
+
+class UsageFlushTest(unittest.IsolatedAsyncioTestCase):
+    async def test_shutdown_keeps_a_batch_being_written(self):
+        environ = {"BOT_TOKEN": "offline", "DATABASE_URI": "mongodb://example", "USAGE_FLUSH_INTERVAL": "0.01"}
+        with mock.patch.dict(os.environ, environ):
+            bot = PastaBot(Config())
+        bot.db = InMemoryDatabase(latency=0.2)
+        # Runs setup_hook, which starts the periodic flush
+        await FakeGateway(bot).connect()
+        await bot.db_ready
+
+        bot.usage.hit(1, 'pasta')
+        await asyncio.sleep(0.1)
+        # The periodic flush is now in the middle of writing the first batch
+        self.assertEqual(len(bot.usage), 0)
+        self.assertFalse(bot.db.usage)
+        bot.usage.hit(1, 'pasta')
+
+        await bot.shutdown()
+        self.assertEqual(sum(bot.db.usage.values()), 2)
+        self.assertTrue(bot.db.closed)
+
+if __name__ == "__main__":
+    unittest.main()